@@ -0,0 +1,49 @@
+"""
+In-process stand-in for FCM, selected with PUSH_TRANSPORT=fake. It records
+what would have been pushed, waits FAKE_PUSH_LATENCY_MS per send call and
+answers UNREGISTERED for tokens starting with FAKE_PUSH_DEAD_PREFIX or for
+a random FAKE_PUSH_UNREGISTERED_RATE share of messages.
+"""
+from collections import deque
+import asyncio
+import os
+import random
+
+FAKE_PUSH_LATENCY_MS = float(os.getenv("FAKE_PUSH_LATENCY_MS", "50"))
+FAKE_PUSH_UNREGISTERED_RATE = float(os.getenv("FAKE_PUSH_UNREGISTERED_RATE", "0"))
+FAKE_PUSH_DEAD_PREFIX = os.getenv("FAKE_PUSH_DEAD_PREFIX", "dead-")
+# Only the most recent messages are kept; counters cover everything.
+FAKE_PUSH_KEEP = int(os.getenv("FAKE_PUSH_KEEP", "1000"))
+
+
+class FakePushTransport:
+    def __init__(self, max_in_flight):
+        self.messages = deque(maxlen=FAKE_PUSH_KEEP)
+        self.calls = 0
+        self.delivered = 0
+        self.unregistered = 0
+        self._in_flight = asyncio.Semaphore(max_in_flight)
+
+    async def send_each(self, messages):
+        async with self._in_flight:
+            self.calls += 1
+            if FAKE_PUSH_LATENCY_MS:
+                await asyncio.sleep(FAKE_PUSH_LATENCY_MS / 1000)
+
+        results = []
+        for message in messages:
+            token = message[0]
+            if token.startswith(FAKE_PUSH_DEAD_PREFIX) or random.random() < FAKE_PUSH_UNREGISTERED_RATE:
+                self.unregistered += 1
+                results.append({"success": False, "error": "UNREGISTERED_TOKEN", "delete_token": True})
+                continue
+            self.delivered += 1
+            self.messages.append(message)
+            results.append({"success": True, "message_id": f"fake-{self.calls}-{len(results)}"})
+        return results
+
+    def reset(self):
+        self.messages.clear()
+        self.calls = 0
+        self.delivered = 0
+        self.unregistered = 0
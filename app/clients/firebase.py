@@ -1,19 +1,31 @@
 import firebase_admin
 from firebase_admin import messaging, credentials
+from app.clients.fake_push import FakePushTransport
+from concurrent.futures import ThreadPoolExecutor
 import asyncio
 import os
-from typing import Optional
+from typing import List, Optional, Tuple
 
 BASE_DIR = os.path.dirname(os.path.dirname(os.path.dirname(__file__)))
 firebase_path = os.path.join(BASE_DIR, "app", "config", "firebase_key.json")
 
-if not firebase_admin._apps:
+# fcm talks to Google; fake records pushes locally (see app/clients/fake_push.py).
+PUSH_TRANSPORT = os.getenv("PUSH_TRANSPORT", "fcm")
+# FCM accepts at most 500 messages per send_each call.
+FCM_BATCH_SIZE = 500
+# Threads for blocking FCM calls, i.e. how many send/send_each calls run at once.
+PUSH_CONCURRENCY = int(os.getenv("PUSH_CONCURRENCY", "4"))
+
+if PUSH_TRANSPORT == "fcm" and not firebase_admin._apps:
     cred = credentials.Certificate(firebase_path)
     firebase_admin.initialize_app(cred)
 
+_executor = ThreadPoolExecutor(max_workers=PUSH_CONCURRENCY, thread_name_prefix="fcm")
+fake_transport = FakePushTransport(PUSH_CONCURRENCY) if PUSH_TRANSPORT == "fake" else None
 
-def _send_fcm_message(device_token: str, title: str, body: str, data: Optional[dict] = None):
-    message = messaging.Message(
+
+def _build_message(device_token: str, title: str, body: str, data: Optional[dict] = None):
+    return messaging.Message(
         notification=messaging.Notification(
             title=title,
             body=body,
@@ -22,15 +34,38 @@ def _send_fcm_message(device_token: str, title: str, body: str, data: Optional[d
         data=data or {}
     )
 
-    return messaging.send(message)
+
+def _send_fcm_message(device_token: str, title: str, body: str, data: Optional[dict] = None):
+    return messaging.send(_build_message(device_token, title, body, data))
+
+
+def _error_result(e):
+    invalid_token = isinstance(e, messaging.InvalidArgumentError) and "registration token" in str(e).lower()
+    if isinstance(e, (messaging.UnregisteredError, messaging.SenderIdMismatchError)) or invalid_token:
+        return {
+            "success": False,
+            "error": "UNREGISTERED_TOKEN",
+            "delete_token": True
+        }
+    if isinstance(e, messaging.InvalidArgumentError):
+        return {
+            "success": False,
+            "error": f"INVALID_ARGUMENT: {str(e)}"
+        }
+    return {
+        "success": False,
+        "error": f"FCM_ERROR: {str(e)}"
+    }
 
 
 async def send_push_notification(device_token: str, title: str, body: str, data: Optional[dict] = None):
+    if fake_transport:
+        return (await fake_transport.send_each([(device_token, title, body, data)]))[0]
     try:
         loop = asyncio.get_running_loop()
 
         response = await loop.run_in_executor(
-            None,
+            _executor,
             _send_fcm_message,
             device_token,
             title,
@@ -43,21 +78,34 @@ async def send_push_notification(device_token: str, title: str, body: str, data:
             "message_id": response
         }
 
-    except messaging.UnregisteredError:
-        return {
-            "success": False,
-            "error": "UNREGISTERED_TOKEN",
-            "delete_token": True
-        }
+    except Exception as e:
+        return _error_result(e)
 
-    except messaging.InvalidArgumentError as e:
-        return {
-            "success": False,
-            "error": f"INVALID_ARGUMENT: {str(e)}"
-        }
 
-    except Exception as e:
-        return {
-            "success": False,
-            "error": f"FCM_ERROR: {str(e)}"
-        }
\ No newline at end of file
+async def send_push_batch(messages: List[Tuple[str, str, str, Optional[dict]]]):
+    """
+    Sends (device_token, title, body, data) messages with send_each, up to
+    FCM_BATCH_SIZE per call. Returns one result per message, in order, in the
+    same shape as send_push_notification.
+    """
+    loop = asyncio.get_running_loop()
+
+    async def send_chunk(chunk):
+        if fake_transport:
+            return await fake_transport.send_each(chunk)
+        try:
+            batch = await loop.run_in_executor(
+                _executor,
+                messaging.send_each,
+                [_build_message(*message) for message in chunk]
+            )
+        except Exception as e:
+            return [_error_result(e)] * len(chunk)
+        return [
+            {"success": True, "message_id": response.message_id} if response.success else _error_result(response.exception)
+            for response in batch.responses
+        ]
+
+    chunks = [messages[i:i + FCM_BATCH_SIZE] for i in range(0, len(messages), FCM_BATCH_SIZE)]
+    results = await asyncio.gather(*(send_chunk(chunk) for chunk in chunks))
+    return [result for chunk_results in results for result in chunk_results]
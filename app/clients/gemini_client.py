@@ -1,8 +1,13 @@
 from google import genai
+from google.genai import types
 from dotenv import load_dotenv
 import os
 
 load_dotenv()
 
 api_key = os.getenv("GOOGLE_API_KEY")
-client = genai.Client(api_key=api_key) 
\ No newline at end of file
+base_url = os.getenv("GEMINI_BASE_URL")
+client = genai.Client(
+    api_key=api_key,
+    http_options=types.HttpOptions(base_url=base_url) if base_url else None
+)
\ No newline at end of file
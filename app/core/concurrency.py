@@ -1,3 +1,4 @@
 import asyncio
+import os
 
-llm_semaphore = asyncio.Semaphore(3)
\ No newline at end of file
+llm_semaphore = asyncio.Semaphore(int(os.getenv("LLM_CONCURRENCY", "3")))
\ No newline at end of file
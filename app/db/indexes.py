@@ -0,0 +1,65 @@
+from app.db.mongo import db
+import os
+
+LLM_CALLS_RETENTION_DAYS = int(os.getenv("LLM_CALLS_RETENTION_DAYS", "30"))
+
+
+async def _dedupe_user_devices():
+    # Registration used to find-then-insert, so a token may exist more than once; keep its latest row.
+    # Once the unique index exists duplicates cannot come back, so startup skips the scan.
+    indexes = await db.user_devices.index_information()
+    if any(index.get("unique") and index["key"] == [("device_token", 1)] for index in indexes.values()):
+        return
+
+    pipeline = [
+        {"$sort": {"updated_at": -1}},
+        {"$group": {"_id": "$device_token", "ids": {"$push": "$_id"}, "count": {"$sum": 1}}},
+        {"$match": {"count": {"$gt": 1}}}
+    ]
+    async for group in db.user_devices.aggregate(pipeline, allowDiskUse=True):
+        await db.user_devices.delete_many({"_id": {"$in": group["ids"][1:]}})
+
+
+async def ensure_indexes():
+    await db.llm_routes.create_index("task", unique=True)
+    await db.llm_calls.create_index("created_at", expireAfterSeconds=LLM_CALLS_RETENTION_DAYS * 24 * 60 * 60)
+    await db.llm_calls.create_index([("task", 1), ("created_at", -1)])
+    await db.llm_calls.create_index([("user_id", 1), ("created_at", -1)])
+    await db.chat_history.create_index([("conversation_id", 1), ("created_at", -1)])
+    await db.conversation_memory.create_index("conversation_id", unique=True)
+    await db.report_jobs.create_index("idempotency_key", unique=True)
+    await db.report_jobs.create_index([("status", 1), ("created_at", 1)])
+    await db.chat_history.create_index([("user_id", 1), ("profile_id", 1), ("created_at", -1)])
+    await db.profile_summaries.create_index([("user_id", 1), ("profile_id", 1)], unique=True)
+    await db.users.create_index("timezone")
+    await db.notifications.create_index(
+        [("user_id", 1), ("type", 1), ("local_date", 1)],
+        unique=True,
+        partialFilterExpression={"local_date": {"$exists": True}}
+    )
+    await db.notifications.create_index([("status", 1), ("send_at", 1)])
+    await db.notifications.create_index([("user_id", 1), ("created_at", -1), ("_id", -1)])
+    await db.notifications.create_index([("user_id", 1), ("is_read", 1), ("created_at", 1)])
+    await db.notifications.create_index([("created_at", -1), ("_id", -1)])
+    await db.notifications.create_index([("type", 1), ("created_at", -1), ("_id", -1)])
+    # The admin feed filtered by status sorts on (created_at, _id); the same index serves the purge.
+    await db.notifications.create_index([("status", 1), ("created_at", -1), ("_id", -1)])
+    existing = await db.notifications.index_information()
+    for stale in ("status_1_created_at_1", "claim_token_1"):
+        if stale in existing:
+            await db.notifications.drop_index(stale)
+    await db.notifications.create_index(
+        "claim_token",
+        name="claim_token_claimed",
+        partialFilterExpression={"claim_token": {"$type": "string"}}
+    )
+    await _dedupe_user_devices()
+    await db.user_devices.create_index("device_token", unique=True)
+    await db.user_devices.create_index([("user_id", 1), ("is_active", 1)])
+    await db.broadcast_jobs.create_index([("status", 1), ("created_at", 1)])
+    await db.campaigns.create_index([("status", 1), ("created_at", -1)])
+    await db.campaigns.create_index([("created_at", -1), ("_id", -1)])
+    await db.notifications.create_index(
+        [("campaign_id", 1), ("status", 1)],
+        partialFilterExpression={"campaign_id": {"$exists": True}}
+    )
@@ -2,12 +2,15 @@ from motor.motor_asyncio import AsyncIOMotorClient
 from functools import lru_cache
 from pydantic_settings import BaseSettings, SettingsConfigDict
 from urllib.parse import quote_plus  # <-- important
+from typing import Optional
 
 class Settings(BaseSettings):
     MONGO_USERNAME: str
     MONGO_PASSWORD: str
     MONGO_HOST: str
     MONGO_DB: str
+    # Full connection string, overrides the Atlas URI built below (e.g. mongodb://localhost:27017 for local runs).
+    MONGO_URI: Optional[str] = None
     model_config = SettingsConfigDict(
         env_file=".env",
         extra="allow"
@@ -23,7 +26,7 @@ _settings = get_settings()
 username = quote_plus(_settings.MONGO_USERNAME)
 password = quote_plus(_settings.MONGO_PASSWORD)
 
-MONGO_URI = f"mongodb+srv://{username}:{password}@{_settings.MONGO_HOST}/{_settings.MONGO_DB}?retryWrites=true&w=majority"
+MONGO_URI = _settings.MONGO_URI or f"mongodb+srv://{username}:{password}@{_settings.MONGO_HOST}/{_settings.MONGO_DB}?retryWrites=true&w=majority"
 
 # Create async Mongo client
 _client = AsyncIOMotorClient(MONGO_URI)
@@ -2,6 +2,13 @@ from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from app.routes import astrology, auth, prompt, admin, report, prediction, user, profile, conversation, compatibility, subscription, notification
 from app.exception import validation_exception_handler
+from app.db.indexes import ensure_indexes
+from app.services.report_job_service import start_report_workers, stop_report_workers
+from app.services.broadcast_service import start_broadcast_workers, stop_broadcast_workers
+from app.utils.pdf_renderer import shutdown_pdf_renderer
+from app.utils.storage import STORAGE_BACKEND, LOCAL_STORAGE_DIR, LOCAL_STORAGE_URL_PREFIX
+from fastapi.staticfiles import StaticFiles
+import os
 from fastapi.exceptions import RequestValidationError
 
 app = FastAPI()
@@ -29,6 +36,23 @@ app.include_router(compatibility.router, prefix="/compatibility")
 app.include_router(subscription.router, prefix="/subscription")
 app.include_router(notification.router, prefix="/notification")
 
+# Local storage is for development only: everything under the mount is public.
+if STORAGE_BACKEND == "local":
+    os.makedirs(LOCAL_STORAGE_DIR, exist_ok=True)
+    app.mount(LOCAL_STORAGE_URL_PREFIX, StaticFiles(directory=LOCAL_STORAGE_DIR), name="files")
+
+@app.on_event("startup")
+async def startup():
+    await ensure_indexes()
+    start_report_workers()
+    start_broadcast_workers()
+
+@app.on_event("shutdown")
+async def shutdown():
+    await stop_report_workers()
+    await stop_broadcast_workers()
+    shutdown_pdf_renderer()
+
 @app.get("/")
 async def root():
     return {"message": "Welcome to the FastAPI project!"}
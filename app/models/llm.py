@@ -0,0 +1,35 @@
+from pydantic import BaseModel, field_validator
+from typing import Optional
+
+
+class LLMRouteUpdate(BaseModel):
+    tier: Optional[str] = None
+    max_output_tokens: Optional[int] = None
+    temperature: Optional[float] = None
+    timeout: Optional[float] = None
+    hedge: Optional[bool] = None
+    thinking_budget: Optional[int] = None
+
+    @field_validator("max_output_tokens")
+    def validate_max_output_tokens(cls, v):
+        if v is not None and (v < 1 or v > 65536):
+            raise ValueError("max_output_tokens must be between 1 and 65536")
+        return v
+
+    @field_validator("temperature")
+    def validate_temperature(cls, v):
+        if v is not None and (v < 0 or v > 2):
+            raise ValueError("temperature must be between 0 and 2")
+        return v
+
+    @field_validator("timeout")
+    def validate_timeout(cls, v):
+        if v is not None and (v <= 0 or v > 600):
+            raise ValueError("timeout must be between 0 and 600 seconds")
+        return v
+
+    @field_validator("thinking_budget")
+    def validate_thinking_budget(cls, v):
+        if v is not None and (v < 0 or v > 24576):
+            raise ValueError("thinking_budget must be between 0 and 24576")
+        return v
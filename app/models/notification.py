@@ -1,4 +1,4 @@
-from pydantic import BaseModel
+from pydantic import BaseModel, field_validator
 from typing import Optional
 from bson import ObjectId
 from datetime import datetime
@@ -30,3 +30,17 @@ class TestNotification(BaseModel):
 class AdminNotificationRequest(BaseModel):
     title: str
     message: str
+
+
+class CampaignCreate(BaseModel):
+    title: str
+    message: str
+    local_hour: int
+    is_subscribed: bool = False
+    platform: Optional[str] = None
+
+    @field_validator("local_hour")
+    def validate_local_hour(cls, v):
+        if v < 0 or v > 23:
+            raise ValueError("local_hour must be between 0 and 23")
+        return v
@@ -1,5 +1,10 @@
 from pydantic import BaseModel
-from typing import Optional
+from typing import Optional, List
+
+class ReportSection(BaseModel):
+    title: str
+    prompt: Optional[str] = None
+
 
 class ReportCreate(BaseModel):
     name: str
@@ -7,6 +12,7 @@ class ReportCreate(BaseModel):
     sub_title: str
     description: str
     prompt: str
+    sections: Optional[List[ReportSection]] = None
 
 
 class ReportUpdate(BaseModel):
@@ -15,3 +21,4 @@ class ReportUpdate(BaseModel):
     sub_title: Optional[str] = None
     description: Optional[str] = None
     prompt: Optional[str] = None
+    sections: Optional[List[ReportSection]] = None
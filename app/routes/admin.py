@@ -1,6 +1,10 @@
-from fastapi import APIRouter, HTTPException, status
+from fastapi import APIRouter, HTTPException, status, Depends, Query
 from app.models.login import AdminLoginRequest
+from app.models.llm import LLMRouteUpdate
 from app.services.auth_service import get_user_by_email, verify_password, create_access_token
+from app.services.llm_service import fetch_llm_routes, update_llm_route, fetch_llm_metrics, fetch_llm_usage_report
+from app.deps.auth_deps import get_current_user
+from app.utils.admin import is_user_admin
 from app.db.mongo import db
 
 router = APIRouter()
@@ -23,4 +27,75 @@ async def login_for_admin(payload: AdminLoginRequest):
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"Error while logging in admin: {str(e)}"
-        )
\ No newline at end of file
+        )
+
+
+@router.get("/llm/routes")
+async def get_llm_routes(current_user = Depends(get_current_user)):
+    try:
+        if not is_user_admin(current_user):
+            raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="You don't have access to this feature")
+
+        routes = await fetch_llm_routes()
+        return {"message": "LLM Routes Fetched Successfully", "result": routes}
+    except HTTPException as http_err:
+        raise http_err
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Error while fetching llm routes: {str(e)}"
+        )
+
+
+@router.patch("/llm/routes/{task}")
+async def patch_llm_route(task: str, payload: LLMRouteUpdate, current_user = Depends(get_current_user)):
+    try:
+        if not is_user_admin(current_user):
+            raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="You don't have access to this feature")
+
+        update_data = payload.dict(exclude_unset=True)
+        if not update_data:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="No fields to update")
+        route = await update_llm_route(task, update_data)
+        return {"message": "LLM Route Updated Successfully", "result": route}
+    except HTTPException as http_err:
+        raise http_err
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Error while updating llm route: {str(e)}"
+        )
+
+
+@router.get("/llm/metrics")
+async def get_llm_metrics(current_user = Depends(get_current_user)):
+    try:
+        if not is_user_admin(current_user):
+            raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="You don't have access to this feature")
+
+        metrics = await fetch_llm_metrics()
+        return {"message": "LLM Metrics Fetched Successfully", "result": metrics}
+    except HTTPException as http_err:
+        raise http_err
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Error while fetching llm metrics: {str(e)}"
+        )
+
+
+@router.get("/llm/usage")
+async def get_llm_usage_report(since_hours: int = Query(24), group_by: str = Query("task"), current_user = Depends(get_current_user)):
+    try:
+        if not is_user_admin(current_user):
+            raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="You don't have access to this feature")
+
+        report = await fetch_llm_usage_report(since_hours, group_by)
+        return {"message": "LLM Usage Report Fetched Successfully", "result": report}
+    except HTTPException as http_err:
+        raise http_err
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Error while fetching llm usage report: {str(e)}"
+        )
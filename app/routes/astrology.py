@@ -1,6 +1,7 @@
 from fastapi import APIRouter, HTTPException, Depends, status, Body, Query
-from app.services.astrology_service import fetch_predictions_for_user, fetch_chat_history_for_user, generate_report_from_ai, fetch_dashboard_predictions, fetch_dynamic_questions, add_chat_like_in_db, add_chat_dislike_in_db, fetch_user_likes, fetch_user_dislikes, fetch_user_profile_summary, edit_message_in_chat, delete_message_from_db
+from app.services.astrology_service import fetch_predictions_for_user, fetch_chat_history_for_user, fetch_dashboard_predictions, fetch_dynamic_questions, add_chat_like_in_db, add_chat_dislike_in_db, fetch_user_likes, fetch_user_dislikes, fetch_user_profile_summary, edit_message_in_chat, delete_message_from_db
 from app.services.subscription_service import fetch_user_coins
+from app.services.report_job_service import enqueue_report_job, fetch_report_job, report_job_events
 from app.models.user_question import UserQuestionObj, ChatLikePayload
 from app.models.conversation import ChatUpdatePayload
 from app.deps.auth_deps import get_current_user
@@ -8,7 +9,7 @@ from app.utils.admin import is_user_admin
 from app.utils.enums.category import Category
 import json
 from bson import json_util
-from fastapi.responses import FileResponse
+from fastapi.responses import FileResponse, StreamingResponse
 
 router = APIRouter()
 
@@ -82,16 +83,16 @@ async def get_chat_history(id: str, user_id: str,  category: str = Query(None),
 
 
 @router.post("/report/{id}")
-async def generate_report(id: str, profile_id: str = Query(None), pdf_report: bool = Query(None), language: str = Query("English"), current_user = Depends(get_current_user)):
+async def generate_report(id: str, profile_id: str = Query(None), language: str = Query("English"), current_user = Depends(get_current_user)):
     try:
         user_id = current_user["_id"]
         if not id:
             raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Report ID Is Required")
         if profile_id is None:
             profile_id = user_id
-        generated_report, conversation_id = await generate_report_from_ai(id, user_id, profile_id, pdf_report, language)
+        job = await enqueue_report_job(id, user_id, profile_id, language)
         coins = await fetch_user_coins(user_id)
-        return {"message": "Report Generated Successfully", "result": generated_report, "coins": coins}
+        return {"message": "Report Generation Started", "job_id": job["_id"], "result": job, "coins": coins}
     except HTTPException as http_err:
         raise http_err
     except Exception as e:
@@ -99,6 +100,37 @@ async def generate_report(id: str, profile_id: str = Query(None), pdf_report: bo
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"Error while generating report: {str(e)}"
         )
+
+
+@router.get("/report/jobs/{job_id}")
+async def get_report_job(job_id: str, current_user = Depends(get_current_user)):
+    try:
+        user_id = current_user["_id"]
+        job = await fetch_report_job(job_id, user_id)
+        coins = await fetch_user_coins(user_id)
+        return {"message": "Report Job Fetched Successfully", "result": job, "coins": coins}
+    except HTTPException as http_err:
+        raise http_err
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Error while fetching report job: {str(e)}"
+        )
+
+
+@router.get("/report/jobs/{job_id}/events")
+async def stream_report_job(job_id: str, current_user = Depends(get_current_user)):
+    try:
+        user_id = current_user["_id"]
+        await fetch_report_job(job_id, user_id)
+        return StreamingResponse(report_job_events(job_id, user_id), media_type="text/event-stream")
+    except HTTPException as http_err:
+        raise http_err
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Error while streaming report job: {str(e)}"
+        )
     
 
 @router.post("/dashboard")
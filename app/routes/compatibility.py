@@ -3,7 +3,7 @@ from app.deps.auth_deps import get_current_user
 from app.utils.admin import is_user_admin
 import json
 from bson import json_util
-from app.services.compatibility_service import add_compatibility_prompt, fetch_compatibilities, delete_compatibility_from_db, update_compatibility_by_id, fetch_compatibility_by_id, generate_compatibility_report, fetch_user_compatibility_reports, fetch_question_about_report, fetch_report_chat
+from app.services.compatibility_service import add_compatibility_prompt, fetch_compatibilities, delete_compatibility_from_db, update_compatibility_by_id, fetch_compatibility_by_id, generate_compatibility_report, fetch_user_compatibility_reports, fetch_question_about_report, fetch_report_chat, fetch_compatibility_report_pdf
 from app.services.subscription_service import fetch_user_coins
 from app.models.compatibility import CompatibilityCreate, CompatibilityUpdate, CompatibilityReportCreate
 from app.models.user_question import ChatQuestionPayload
@@ -44,6 +44,20 @@ async def get_compatibility_between_profiles(payload: CompatibilityReportCreate,
             detail=f"Error while generating compatibility report: {str(e)}"
         )
 
+@router.get("/report/{report_id}/pdf")
+async def download_compatibility_report_pdf(report_id: str, current_user = Depends(get_current_user)):
+    try:
+        user_id = current_user["_id"]
+        result = await fetch_compatibility_report_pdf(user_id, report_id)
+        return {"message": "Report PDF Fetched Successfully", "result": result}
+    except HTTPException as http_err:
+        raise http_err
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Error while fetching compatibility report pdf: {str(e)}"
+        )
+
 @router.post("/report/{report_id}/chat")
 async def ask_question_about_report(report_id: str, payload: ChatQuestionPayload, compatibility_report: str = Query(None),  profile_id: str = Query(None), language: str = Query("English"), current_user = Depends(get_current_user)):
     try:
@@ -1,17 +1,20 @@
 from fastapi import APIRouter, Body, HTTPException, Depends, status, Query
 from app.deps.auth_deps import get_current_user
-from app.services.notification_service import fetch_notifications, mark_notification_as_read, fetch_notifications_for_admin, register_user_device_in_db, mark_all_notifications_as_read, push_test_notification_to_device, fetch_dashboard_notifications, mark_all_notifications_as_read_on_dashboard, push_notifications_to_users_helper
+from app.services.notification_service import fetch_notifications, fetch_unread_count, mark_notification_as_read, fetch_notifications_for_admin, register_user_device_in_db, mark_all_notifications_as_read, push_test_notification_to_device, mark_all_notifications_as_read_on_dashboard
+from app.services.broadcast_service import enqueue_broadcast, fetch_broadcast_job
+from app.services.campaign_service import add_campaign_in_db, fetch_campaigns, fetch_campaign_by_id, cancel_campaign_in_db
 from app.utils.admin import is_user_admin
-from app.models.notification import RegisterDevicePayload, TestNotification, AdminNotificationRequest
+from app.models.notification import RegisterDevicePayload, TestNotification, AdminNotificationRequest, CampaignCreate
 
 router = APIRouter()
 
 @router.get("/")
-async def get_notifications(current_user = Depends(get_current_user)):
+async def get_notifications(limit: int = Query(20), cursor: str = Query(None), current_user = Depends(get_current_user)):
     try:
         user_id = current_user["_id"]
-        notifications = await fetch_notifications(user_id)
-        return {"message": "Notifications Fetched Successfully", "result": notifications}
+        notifications, next_cursor = await fetch_notifications(user_id, limit, cursor)
+        unread_count = await fetch_unread_count(user_id)
+        return {"message": "Notifications Fetched Successfully", "result": notifications, "next_cursor": next_cursor, "unread_count": unread_count}
     except HTTPException as http_err:
         raise http_err
     except Exception as e:
@@ -20,14 +23,28 @@ async def get_notifications(current_user = Depends(get_current_user)):
             detail=f"Error while fetching notifications: {str(e)}"
         )
 
+@router.get("/unread-count")
+async def get_unread_count(current_user = Depends(get_current_user)):
+    try:
+        user_id = current_user["_id"]
+        unread_count = await fetch_unread_count(user_id)
+        return {"message": "Unread Count Fetched Successfully", "result": unread_count}
+    except HTTPException as http_err:
+        raise http_err
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Error while fetching unread count: {str(e)}"
+        )
+
 @router.get("/dashboard")
-async def get_dashboard_notifications(current_user = Depends(get_current_user)):
+async def get_dashboard_notifications(limit: int = Query(20), cursor: str = Query(None), type: str = Query(None), notification_status: str = Query(None, alias="status"), user_id: str = Query(None), current_user = Depends(get_current_user)):
     try:
         if not is_user_admin(current_user):
             raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="You don't have access to this feature")
 
-        notifications = await fetch_dashboard_notifications()
-        return {"message": "Notifications Fetched Successfully", "result": notifications}
+        notifications, next_cursor, total = await fetch_notifications_for_admin(current_user["_id"], limit, cursor, type, notification_status, user_id)
+        return {"message": "Notifications Fetched Successfully", "result": notifications, "next_cursor": next_cursor, "total": total}
     except HTTPException as http_err:
         raise http_err
     except Exception as e:
@@ -71,7 +88,7 @@ async def update_all_notifications_on_dashboard(current_user = Depends(get_curre
         if not is_user_admin(current_user):
             raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="You don't have access to this feature")
         
-        await mark_all_notifications_as_read_on_dashboard()
+        await mark_all_notifications_as_read_on_dashboard(current_user["_id"])
         return {"message": "Notifications Updated Successfully"}
     except HTTPException as http_err:
         raise http_err
@@ -83,13 +100,13 @@ async def update_all_notifications_on_dashboard(current_user = Depends(get_curre
 
 
 @router.get("/dashboard/")
-async def get_notifications_for_dashboard(current_user = Depends(get_current_user)):
+async def get_notifications_for_dashboard(limit: int = Query(20), cursor: str = Query(None), type: str = Query(None), notification_status: str = Query(None, alias="status"), user_id: str = Query(None), current_user = Depends(get_current_user)):
     try:
         if not is_user_admin(current_user):
             raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="You don't have access to this feature")
         
-        notifications = await fetch_notifications_for_admin()
-        return {"message": "Notifications Fetched Successfully", "result": notifications}
+        notifications, next_cursor, total = await fetch_notifications_for_admin(current_user["_id"], limit, cursor, type, notification_status, user_id)
+        return {"message": "Notifications Fetched Successfully", "result": notifications, "next_cursor": next_cursor, "total": total}
     except HTTPException as http_err:
         raise http_err
     except Exception as e:
@@ -104,8 +121,8 @@ async def push_notification_to_users(payload: AdminNotificationRequest, is_subsc
         if not is_user_admin(current_user):
             raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="You don't have access to this feature")
 
-        await push_notifications_to_users_helper(payload, is_subscribed)
-        return {"message": "Notification Pushed Successfully"}
+        job = await enqueue_broadcast(payload, is_subscribed, current_user["_id"])
+        return {"message": "Notification Broadcast Started", "job_id": job["_id"], "result": job}
     except HTTPException as http_err:
         raise http_err
     except Exception as e:
@@ -114,6 +131,86 @@ async def push_notification_to_users(payload: AdminNotificationRequest, is_subsc
             detail=f"Error while pushing notifications to users: {str(e)}"
         )    
 
+@router.get("/push-notification/{job_id}")
+async def get_push_notification_job(job_id: str, current_user = Depends(get_current_user)):
+    try:
+        if not is_user_admin(current_user):
+            raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="You don't have access to this feature")
+
+        job = await fetch_broadcast_job(job_id)
+        return {"message": "Broadcast Fetched Successfully", "result": job}
+    except HTTPException as http_err:
+        raise http_err
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Error while fetching broadcast: {str(e)}"
+        )
+
+@router.post("/campaigns")
+async def add_campaign(payload: CampaignCreate, current_user = Depends(get_current_user)):
+    try:
+        if not is_user_admin(current_user):
+            raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="You don't have access to this feature")
+
+        campaign = await add_campaign_in_db(payload, current_user["_id"])
+        return {"message": "Campaign Scheduled Successfully", "result": campaign}
+    except HTTPException as http_err:
+        raise http_err
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Error while scheduling campaign: {str(e)}"
+        )
+
+@router.get("/campaigns")
+async def get_campaigns(limit: int = Query(20), cursor: str = Query(None), current_user = Depends(get_current_user)):
+    try:
+        if not is_user_admin(current_user):
+            raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="You don't have access to this feature")
+
+        campaigns, next_cursor = await fetch_campaigns(limit, cursor)
+        return {"message": "Campaigns Fetched Successfully", "result": campaigns, "next_cursor": next_cursor}
+    except HTTPException as http_err:
+        raise http_err
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Error while fetching campaigns: {str(e)}"
+        )
+
+@router.get("/campaigns/{id}")
+async def get_campaign_by_id(id: str, current_user = Depends(get_current_user)):
+    try:
+        if not is_user_admin(current_user):
+            raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="You don't have access to this feature")
+
+        campaign = await fetch_campaign_by_id(id)
+        return {"message": "Campaign Fetched Successfully", "result": campaign}
+    except HTTPException as http_err:
+        raise http_err
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Error while fetching campaign: {str(e)}"
+        )
+
+@router.post("/campaigns/{id}/cancel")
+async def cancel_campaign(id: str, current_user = Depends(get_current_user)):
+    try:
+        if not is_user_admin(current_user):
+            raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="You don't have access to this feature")
+
+        await cancel_campaign_in_db(id)
+        return {"message": "Campaign Cancelled Successfully"}
+    except HTTPException as http_err:
+        raise http_err
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Error while cancelling campaign: {str(e)}"
+        )
+
 @router.post("/register-device/")
 async def register_user_device(payload: RegisterDevicePayload, current_user = Depends(get_current_user)):
     try:
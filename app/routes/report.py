@@ -2,7 +2,7 @@ from fastapi import APIRouter, HTTPException, status, Depends, Body, Query
 from app.deps.auth_deps import get_current_user
 from app.models.report import ReportCreate, ReportUpdate
 from app.utils.admin import is_user_admin
-from app.services.report_service import add_report_in_db, fetch_reports, fetch_report_by_id, update_report_by_id, delete_report_from_db, add_user_report_to_db, fetch_user_reports, fetch_remaining_reports
+from app.services.report_service import add_report_in_db, fetch_reports, fetch_report_by_id, update_report_by_id, delete_report_from_db, add_user_report_to_db, fetch_user_reports, fetch_remaining_reports, fetch_user_report_pdf
 from app.services.subscription_service import fetch_user_coins
 import json
 from bson import json_util
@@ -91,6 +91,22 @@ async def get_user_reports(profile_id: str = Query(None), current_user = Depends
             detail=f"Error while getting user reports: {str(e)}"
         )
 
+@router.get("/user/{id}/pdf")
+async def download_user_report_pdf(id: str, profile_id: str = Query(None), current_user = Depends(get_current_user)):
+    try:
+        user_id = current_user["_id"]
+        if not profile_id:
+            profile_id = user_id
+        result = await fetch_user_report_pdf(id, user_id, profile_id)
+        return {"message": "Report PDF Fetched Successfully", "result": result}
+    except HTTPException as http_err:
+        raise http_err
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Error while fetching report pdf: {str(e)}"
+        )
+
 @router.get("/{id}")
 async def get_report_by_id(id: str, current_user = Depends(get_current_user)):
     try:
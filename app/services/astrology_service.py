@@ -1,17 +1,17 @@
 from fastapi import HTTPException, status
 from app.db.mongo import db
 from bson import ObjectId
-from google.genai import types
 from datetime import datetime
 import json
 import re
-from app.clients.gemini_client import client
-from app.utils.concurrency import generate_with_retry
+from app.utils.llm import generate_content
 from app.utils.mongo import convert_mongo
-from app.core.concurrency import llm_semaphore
 from app.services.conversation_service import fetch_conversations
 from app.utils.helper import fetch_user_details, get_or_fetch_astrology_data, get_astrology_prediction, fetch_user_report, generate_report_helper, generate_predictions_for_homepage, fetch_profile_details, get_category_from_question, fetch_categories
 
+# Cap on how much new chat activity goes into one profile summary refresh.
+PROFILE_SUMMARY_MAX_MESSAGES = 200
+PROFILE_SUMMARY_MESSAGE_CHARS = 1500
 
 async def fetch_predictions_for_user(id, profile_id, user_question, conversation_id, language):
     try:
@@ -57,7 +57,7 @@ async def fetch_chat_history_for_user(category, id, user_id):
         )
     
 
-async def generate_report_from_ai(id, user_id, profile_id, pdf_report, language):
+async def generate_report_from_ai(id, user_id, profile_id, language, progress=None):
     user_report = await fetch_user_report(id, user_id, profile_id)
     if not user_report:
         raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Forbidden")
@@ -68,7 +68,7 @@ async def generate_report_from_ai(id, user_id, profile_id, pdf_report, language)
     else:
         profile_details = await fetch_profile_details(user_id, profile_id)
     astrology_data = await get_or_fetch_astrology_data(user_id, profile_id, profile_details)
-    generated_report, conversation_id = await generate_report_helper(profile_details, astrology_data, user_report, pdf_report, user_id, profile_id, language)
+    generated_report, conversation_id = await generate_report_helper(profile_details, astrology_data, user_report, user_id, profile_id, language, progress)
     return generated_report, conversation_id
 
 
@@ -79,11 +79,11 @@ async def fetch_dashboard_predictions(user_id, profile_id, language):
     else:
         profile_details = await fetch_profile_details(user_id, profile_id)
     astrology_data = await get_or_fetch_astrology_data(user_id, profile_id, profile_details)
-    text_output, prediction_dict = await generate_predictions_for_homepage(profile_details, astrology_data, language)
+    text_output, prediction_dict = await generate_predictions_for_homepage(profile_details, astrology_data, language, user_id)
     return text_output, prediction_dict
 
 
-async def get_categories_from_questions(questions):
+async def get_categories_from_questions(questions, user_id=None):
     category_list = await fetch_categories()
 
     questions_text = "\n".join([f"{i+1}. {q}" for i, q in enumerate(questions)])
@@ -111,18 +111,12 @@ async def get_categories_from_questions(questions):
     }}
     """
 
-    config = types.GenerateContentConfig(
-        temperature=1.0,
+    response = await generate_content(
+        "question_categories",
+        questions_text,
         system_instruction=system_prompt,
+        user_id=user_id,
     )
-    async with llm_semaphore:
-        response = await generate_with_retry(
-            lambda: client.aio.models.generate_content(
-                model="gemini-3-flash-preview",
-                contents=questions_text,
-                config=config,
-            )
-        )
 
     raw = response.text.strip()
     cleaned = re.sub(r"```json|```", "", raw).strip()
@@ -194,25 +188,18 @@ async def fetch_dynamic_questions(user_id, profile_id, language):
             """
 
 
-        config = types.GenerateContentConfig(
-        temperature=1.0, 
+        response = await generate_content(
+            "follow_up_questions",
+            dynamic_prompt,
+            user_id=user_id,
         )
 
-        async with llm_semaphore:
-            response = await generate_with_retry(
-                lambda: client.aio.models.generate_content(
-                    model="gemini-3-flash-preview",
-                    contents=dynamic_prompt,
-                    config=config,
-                )
-            )
-
         raw_text = response.text.strip()
         cleaned_text = re.sub(r"```json|```", "", raw_text).strip()
         parsed = json.loads(cleaned_text)
         suggested_questions = parsed["questions"]
         suggested_questions_with_categories = list()
-        categories = await get_categories_from_questions(suggested_questions)
+        categories = await get_categories_from_questions(suggested_questions, user_id)
         suggested_questions_with_categories = [
             {
                 "question": q,
@@ -336,10 +323,46 @@ async def fetch_user_dislikes(id, profile_id):
     
 
 
-async def fetch_user_profile_summary(profile_details, conversations, reports):
+async def fetch_user_profile_summary(user_id, profile_id, profile_details=None):
     try:
+        summary_filter = {"user_id": ObjectId(user_id), "profile_id": ObjectId(profile_id)}
+        cached = await db.profile_summaries.find_one(summary_filter) or {}
+
+        message_query = dict(summary_filter)
+        if cached.get("messages_until"):
+            message_query["created_at"] = {"$gt": cached["messages_until"]}
+
+        new_messages = await db.chat_history.find(
+            message_query,
+            {"role": 1, "message": 1, "category": 1, "created_at": 1}
+        ).sort("created_at", -1).limit(PROFILE_SUMMARY_MAX_MESSAGES).to_list(length=None)
+
+        if cached.get("summary") and not new_messages:
+            return cached["summary"]
+        new_messages.reverse()
+
+        if profile_details is None:
+            if profile_id == user_id:
+                profile_details = await fetch_user_details(user_id)
+            else:
+                profile_details = await fetch_profile_details(user_id, profile_id)
+
+        topics = await db.conversations.aggregate([
+            {"$match": summary_filter},
+            {"$group": {"_id": "$category", "count": {"$sum": 1}}},
+            {"$sort": {"count": -1}}
+        ]).to_list(length=None)
+        reports_count = await db.user_reports.count_documents({**summary_filter, "report_text": {"$ne": None}})
+
+        messages_text = "\n".join(
+            f"[{msg['created_at']:%Y-%m-%d %H:%M}] {msg['role']} ({msg.get('category') or 'general'}): {msg['message'][:PROFILE_SUMMARY_MESSAGE_CHARS]}"
+            for msg in new_messages
+        )
+
         system_prompt = """
         Generate a user profile summary based on the user details and the conversations which the user had with the AI chat.
+        If a previous summary is given, update it with the new messages instead of starting over: keep facts that still hold,
+        add new ones and refresh the usage insights.
         Example Response:
 
         User Name: Riya Sharma
@@ -367,27 +390,35 @@ async def fetch_user_profile_summary(profile_details, conversations, reports):
 
         """
         contents = [
-        f"Conversations: \n{conversations}\n\n"
+        f"Previous summary: \n{cached.get('summary') or '(none)'}\n\n"
+        f"New messages since the previous summary: \n{messages_text or '(none)'}\n\n"
         f"Here's the details of the user: \n{profile_details}\n\n",
-        f"User Reports: \n{reports}\n\n"
+        f"Conversations per topic: {[(t['_id'], t['count']) for t in topics]}\n"
+        f"Reports generated: {reports_count}\n\n"
         ]
 
 
-        config = types.GenerateContentConfig(
-            temperature = 1.0,
-            system_instruction = system_prompt
+        response = await generate_content(
+            "profile_summary",
+            contents,
+            system_instruction=system_prompt,
+            user_id=user_id,
         )
 
-        async with llm_semaphore:
-            response = await generate_with_retry(
-                lambda: client.aio.models.generate_content(
-                    model="gemini-3-flash-preview",
-                    contents=contents,
-                    config=config,
-                )
-            )
-
         reply = response.text
+        now = datetime.utcnow()
+        await db.profile_summaries.update_one(
+            summary_filter,
+            {
+                "$set": {
+                    "summary": reply,
+                    "messages_until": new_messages[-1]["created_at"] if new_messages else cached.get("messages_until"),
+                    "updated_at": now
+                },
+                "$setOnInsert": {"created_at": now}
+            },
+            upsert=True
+        )
         return reply
     except HTTPException as http_err:
         raise http_err
@@ -0,0 +1,286 @@
+from fastapi import HTTPException, status
+from app.db.mongo import db
+from bson import ObjectId
+from datetime import datetime, timedelta
+from pymongo import ReturnDocument
+from app.utils.mongo import convert_mongo
+from app.clients.firebase import send_push_batch, FCM_BATCH_SIZE
+from app.services.notification_service import deactivate_dead_tokens
+import asyncio
+import logging
+import os
+import socket
+import uuid
+
+logger = logging.getLogger(__name__)
+
+BROADCAST_WORKERS = int(os.getenv("BROADCAST_WORKERS", "1"))
+# FCM batches of one broadcast in flight at once.
+BROADCAST_CONCURRENCY = int(os.getenv("BROADCAST_CONCURRENCY", "4"))
+BROADCAST_LEASE_SECONDS = int(os.getenv("BROADCAST_LEASE_SECONDS", "120"))
+BROADCAST_POLL_SECONDS = 2.0
+
+_workers = []
+
+
+def _recipients_pipeline(is_subscribed):
+    pipeline = [
+        {"$match": {"role": "user", "is_enabled": True, "is_push_notifications_enabled": True}}
+    ]
+    if is_subscribed:
+        pipeline.extend([
+            {
+                "$lookup": {
+                    "from": "user_subscriptions",
+                    "localField": "_id",
+                    "foreignField": "user_id",
+                    "as": "subscription",
+                    "pipeline": [{"$limit": 1}, {"$project": {"_id": 1}}]
+                }
+            },
+            {"$match": {"subscription.0": {"$exists": True}}}
+        ])
+    pipeline.extend([
+        {
+            "$lookup": {
+                "from": "user_devices",
+                "let": {"user_id": "$_id"},
+                "pipeline": [
+                    {"$match": {"$expr": {"$eq": ["$user_id", "$$user_id"]}, "is_active": True}},
+                    {"$project": {"_id": 0, "device_token": 1}}
+                ],
+                "as": "devices"
+            }
+        },
+        {"$unwind": "$devices"},
+        {"$match": {"devices.device_token": {"$nin": [None, ""]}}},
+        {"$project": {"_id": 0, "device_token": "$devices.device_token"}}
+    ])
+    return pipeline
+
+
+async def enqueue_broadcast(payload, is_subscribed, admin_id):
+    try:
+        now = datetime.utcnow()
+        job = {
+            "title": payload.title,
+            "message": payload.message,
+            "is_subscribed": bool(is_subscribed),
+            "created_by": ObjectId(admin_id),
+            "status": "queued",
+            "total_devices": None,
+            "processed": 0,
+            "sent": 0,
+            "failed": 0,
+            "deactivated": 0,
+            "error": None,
+            "lease_owner": None,
+            "lease_expires_at": None,
+            "created_at": now,
+            "updated_at": now
+        }
+        result = await db.broadcast_jobs.insert_one(job)
+        job["_id"] = result.inserted_id
+        return convert_mongo(job)
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Error while enqueueing broadcast: {str(e)}"
+        )
+
+
+async def fetch_broadcast_job(job_id):
+    try:
+        job = await db.broadcast_jobs.find_one(
+            {"_id": ObjectId(job_id)},
+            {"lease_owner": 0, "lease_expires_at": 0}
+        )
+        if not job:
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Broadcast Not Found")
+        return convert_mongo(job)
+    except HTTPException as http_err:
+        raise http_err
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Error while fetching broadcast: {str(e)}"
+        )
+
+
+async def _claim_next_broadcast(worker_id):
+    now = datetime.utcnow()
+    # Devices reached before the lease ran out are unknown, so a restart would push them twice.
+    # Clearing the owner makes every lease-guarded write of the old worker a no-op.
+    await db.broadcast_jobs.update_many(
+        {"status": "running", "lease_expires_at": {"$lt": now}},
+        {"$set": {
+            "status": "failed",
+            "error": "Broadcast interrupted",
+            "lease_owner": None,
+            "lease_expires_at": None,
+            "finished_at": now,
+            "updated_at": now
+        }}
+    )
+    return await db.broadcast_jobs.find_one_and_update(
+        {"status": "queued"},
+        {
+            "$set": {
+                "status": "running",
+                "lease_owner": worker_id,
+                "lease_expires_at": now + timedelta(seconds=BROADCAST_LEASE_SECONDS),
+                "started_at": now,
+                "updated_at": now
+            }
+        },
+        sort=[("created_at", 1)],
+        return_document=ReturnDocument.AFTER
+    )
+
+
+async def _run_broadcast(job, worker_id):
+    """
+    Streams the recipients into FCM batches, BROADCAST_CONCURRENCY at a time.
+    The lease is renewed on a timer, so a slow count or cursor cannot let it
+    lapse; once a lease-guarded write matches nothing the job belongs to
+    nobody and sending stops.
+    """
+    job_filter = {"_id": job["_id"], "lease_owner": worker_id}
+    pipeline = _recipients_pipeline(job["is_subscribed"])
+    stop = asyncio.Event()
+    errors = []
+
+    def lease_lost():
+        errors.append(RuntimeError("Broadcast lease lost"))
+        stop.set()
+
+    async def renew_lease():
+        while not stop.is_set():
+            await asyncio.sleep(BROADCAST_LEASE_SECONDS / 3)
+            try:
+                result = await db.broadcast_jobs.update_one(job_filter, {"$set": {
+                    "lease_expires_at": datetime.utcnow() + timedelta(seconds=BROADCAST_LEASE_SECONDS),
+                    "updated_at": datetime.utcnow()
+                }})
+            except Exception as e:
+                logger.warning("Could not renew lease of broadcast %s: %s", job["_id"], e)
+                continue
+            if result.matched_count == 0:
+                lease_lost()
+
+    async def count_recipients():
+        # Progress only; runs beside the sends instead of delaying the first batch.
+        try:
+            counted = await db.users.aggregate(pipeline + [{"$count": "total"}]).to_list(length=1)
+            await db.broadcast_jobs.update_one(job_filter, {"$set": {"total_devices": counted[0]["total"] if counted else 0}})
+        except Exception as e:
+            logger.warning("Could not count recipients of broadcast %s: %s", job["_id"], e)
+
+    in_flight = asyncio.Semaphore(BROADCAST_CONCURRENCY)
+
+    async def send_batch(tokens):
+        try:
+            messages = [(token, job["title"], job["message"], None) for token in tokens]
+            results = await send_push_batch(messages)
+            await deactivate_dead_tokens(messages, results)
+            sent = sum(1 for result in results if result["success"])
+            update = await db.broadcast_jobs.update_one(job_filter, {
+                "$inc": {
+                    "processed": len(tokens),
+                    "sent": sent,
+                    "failed": len(tokens) - sent,
+                    "deactivated": sum(1 for result in results if result.get("delete_token"))
+                },
+                "$set": {
+                    "lease_expires_at": datetime.utcnow() + timedelta(seconds=BROADCAST_LEASE_SECONDS),
+                    "updated_at": datetime.utcnow()
+                }
+            })
+            if update.matched_count == 0:
+                lease_lost()
+        except Exception as e:
+            errors.append(e)
+            stop.set()
+        finally:
+            in_flight.release()
+
+    async def spawn(tokens):
+        await in_flight.acquire()
+        if stop.is_set():
+            in_flight.release()
+            return
+        tasks.append(asyncio.create_task(send_batch(tokens)))
+
+    renewer = asyncio.create_task(renew_lease())
+    tasks = [asyncio.create_task(count_recipients())]
+    try:
+        batch = []
+        cursor = db.users.aggregate(pipeline, batchSize=FCM_BATCH_SIZE)
+        async for recipient in cursor:
+            if stop.is_set():
+                break
+            batch.append(recipient["device_token"])
+            if len(batch) == FCM_BATCH_SIZE:
+                await spawn(batch)
+                batch = []
+        if batch and not stop.is_set():
+            await spawn(batch)
+        await asyncio.gather(*tasks, return_exceptions=True)
+    finally:
+        renewer.cancel()
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(renewer, *tasks, return_exceptions=True)
+
+    if errors:
+        raise errors[0]
+
+
+async def _worker_loop(worker_id):
+    while True:
+        try:
+            job = await _claim_next_broadcast(worker_id)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.warning("Broadcast worker %s could not claim a job: %s", worker_id, e)
+            job = None
+
+        if not job:
+            await asyncio.sleep(BROADCAST_POLL_SECONDS)
+            continue
+
+        update = {"status": "succeeded", "error": None}
+        try:
+            await _run_broadcast(job, worker_id)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.warning("Broadcast %s failed: %s", job["_id"], e)
+            update = {"status": "failed", "error": str(e)}
+
+        now = datetime.utcnow()
+        try:
+            await db.broadcast_jobs.update_one(
+                {"_id": job["_id"], "lease_owner": worker_id},
+                {"$set": {**update, "lease_owner": None, "lease_expires_at": None, "finished_at": now, "updated_at": now}}
+            )
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            # The lease then expires and the next claim marks the job interrupted.
+            logger.warning("Could not record the result of broadcast %s: %s", job["_id"], e)
+
+
+def start_broadcast_workers():
+    host = socket.gethostname()
+    for i in range(BROADCAST_WORKERS):
+        worker_id = f"{host}:{os.getpid()}:{i}:{uuid.uuid4().hex[:6]}"
+        _workers.append(asyncio.create_task(_worker_loop(worker_id)))
+
+
+async def stop_broadcast_workers():
+    for task in _workers:
+        task.cancel()
+    await asyncio.gather(*_workers, return_exceptions=True)
+    _workers.clear()
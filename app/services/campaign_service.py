@@ -0,0 +1,230 @@
+from fastapi import HTTPException, status
+from app.db.mongo import db
+from bson import ObjectId
+from datetime import datetime, timezone, timedelta
+from app.utils.mongo import convert_mongo
+from app.services.notification_service import scheduler, zones_at_local_hour, timezone_filter, insert_daily_notifications, DEFAULT_TIMEZONE, INBOX_PAGE_SIZE, INBOX_MAX_PAGE_SIZE, _inbox_cursor, _cursor_filter, _bump_unread_counts
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Every zone reaches the campaign's local hour once within this window after creation.
+CAMPAIGN_DURATION = timedelta(hours=25)
+
+
+async def add_campaign_in_db(payload, admin_id):
+    try:
+        now = datetime.now(timezone.utc)
+        campaign = {
+            "title": payload.title,
+            "message": payload.message,
+            "local_hour": payload.local_hour,
+            "is_subscribed": payload.is_subscribed,
+            "platform": payload.platform,
+            "status": "scheduled",
+            "zones_done": [],
+            "recipients": 0,
+            "created_by": ObjectId(admin_id),
+            "created_at": now,
+            "ends_at": now + CAMPAIGN_DURATION
+        }
+        result = await db.campaigns.insert_one(campaign)
+        campaign["_id"] = result.inserted_id
+        return convert_mongo(campaign)
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Error while adding campaign to db: {str(e)}"
+        )
+
+
+async def _campaign_stats(campaign_ids):
+    pipeline = [
+        {"$match": {"campaign_id": {"$in": campaign_ids}}},
+        {"$group": {"_id": {"campaign_id": "$campaign_id", "status": "$status"}, "count": {"$sum": 1}}}
+    ]
+    stats = {}
+    async for row in db.notifications.aggregate(pipeline):
+        stats.setdefault(row["_id"]["campaign_id"], {})[row["_id"]["status"]] = row["count"]
+    return stats
+
+
+async def fetch_campaigns(limit=INBOX_PAGE_SIZE, cursor=None):
+    """
+    One page of campaigns, newest first, and the cursor for the next page
+    (None on the last one).
+    """
+    try:
+        limit = max(1, min(limit, INBOX_MAX_PAGE_SIZE))
+        campaigns = await db.campaigns.find(_cursor_filter(cursor), {"zones_done": 0}).sort(
+            [("created_at", -1), ("_id", -1)]
+        ).limit(limit + 1).to_list(length=None)
+        next_cursor = _inbox_cursor(campaigns[limit - 1]) if len(campaigns) > limit else None
+        campaigns = campaigns[:limit]
+        stats = await _campaign_stats([c["_id"] for c in campaigns])
+        for campaign in campaigns:
+            campaign["delivery"] = stats.get(campaign["_id"], {})
+        return convert_mongo(campaigns), next_cursor
+    except HTTPException as http_err:
+        raise http_err
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Error while fetching campaigns from db: {str(e)}"
+        )
+
+
+async def fetch_campaign_by_id(id):
+    try:
+        campaign = await db.campaigns.find_one({"_id": ObjectId(id)})
+        if not campaign:
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Campaign Not Found")
+        stats = await _campaign_stats([campaign["_id"]])
+        campaign["delivery"] = stats.get(campaign["_id"], {})
+        return convert_mongo(campaign)
+    except HTTPException as http_err:
+        raise http_err
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Error while fetching campaign from db: {str(e)}"
+        )
+
+
+async def cancel_campaign_in_db(id):
+    try:
+        result = await db.campaigns.update_one(
+            {"_id": ObjectId(id), "status": {"$in": ["scheduled", "running"]}},
+            {"$set": {"status": "cancelled"}}
+        )
+        if result.matched_count == 0:
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Active Campaign Not Found")
+        # Pending rows were never pushed: marking them first keeps senders off them,
+        # then they leave the inboxes and the unread counters they were added to.
+        cancelled = {"campaign_id": ObjectId(id), "status": "cancelled"}
+        await db.notifications.update_many(
+            {"campaign_id": ObjectId(id), "status": "pending"},
+            {"$set": {"status": "cancelled"}}
+        )
+        unread = await db.notifications.aggregate([
+            {"$match": {**cancelled, "is_read": False}},
+            {"$group": {"_id": "$user_id", "count": {"$sum": 1}, "oldest": {"$min": "$created_at"}}}
+        ]).to_list(length=None)
+        await db.notifications.delete_many(cancelled)
+        await _drop_unread(unread)
+    except HTTPException as http_err:
+        raise http_err
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Error while cancelling campaign: {str(e)}"
+        )
+
+
+async def _drop_unread(unread):
+    """
+    Takes deleted unread rows off users.unread_notifications. Rows hidden by
+    a newer "mark all as read" watermark were never counted; when only some
+    of a user's rows are, the counter is dropped and recounted on next read.
+    """
+    if not unread:
+        return
+    users = await db.users.find(
+        {"_id": {"$in": [row["_id"] for row in unread]}},
+        {"notifications_read_at": 1}
+    ).to_list(length=None)
+    read_at = {user["_id"]: user.get("notifications_read_at") for user in users}
+    deltas, recount = {}, []
+    for row in unread:
+        watermark = read_at.get(row["_id"])
+        if not watermark or watermark < row["oldest"]:
+            deltas[row["_id"]] = -row["count"]
+        else:
+            recount.append(row["_id"])
+    await _bump_unread_counts(deltas)
+    if recount:
+        await db.users.update_many({"_id": {"$in": recount}}, {"$unset": {"unread_notifications": ""}})
+
+
+def _audience_pipeline(campaign, zones):
+    pipeline = [
+        {"$match": {"role": "user", "is_enabled": True, "is_push_notifications_enabled": True, "$or": timezone_filter(zones)}}
+    ]
+    if campaign.get("is_subscribed"):
+        pipeline.extend([
+            {"$lookup": {"from": "user_subscriptions", "localField": "_id", "foreignField": "user_id", "as": "subscription"}},
+            {"$match": {"subscription.0": {"$exists": True}}}
+        ])
+    if campaign.get("platform"):
+        pipeline.extend([
+            {"$lookup": {"from": "user_devices", "localField": "_id", "foreignField": "user_id", "as": "devices"}},
+            {"$match": {"devices": {"$elemMatch": {"platform": campaign["platform"], "is_active": True}}}}
+        ])
+    pipeline.append({"$project": {"_id": 1, "timezone": 1}})
+    return pipeline
+
+
+async def fan_out_campaign(campaign, now_utc):
+    """
+    Queues the campaign for users in every zone that is now at its local hour
+    and has not been reached yet. Notifications go through the regular push
+    pipeline; the unique (user_id, type, local_date) index makes a repeated
+    zone harmless.
+    """
+    zones = {
+        zone: local_date
+        for zone, local_date in zones_at_local_hour(now_utc, campaign["local_hour"]).items()
+        if zone not in campaign.get("zones_done", [])
+    }
+    if not zones:
+        return
+
+    notifications = []
+    async for user in db.users.aggregate(_audience_pipeline(campaign, zones)):
+        notifications.append({
+            "user_id": user["_id"],
+            "title": campaign["title"],
+            "message": campaign["message"],
+            "type": f"campaign:{campaign['_id']}",
+            "campaign_id": campaign["_id"],
+            "platform": campaign.get("platform"),
+            "local_date": zones[user.get("timezone", DEFAULT_TIMEZONE)],
+            "status": "pending",
+            "send_at": now_utc,
+            "is_read": False,
+            "created_at": now_utc
+        })
+
+    inserted = await insert_daily_notifications(notifications) if notifications else 0
+    await db.campaigns.update_one(
+        {"_id": campaign["_id"], "status": {"$in": ["scheduled", "running"]}},
+        {
+            "$addToSet": {"zones_done": {"$each": list(zones)}},
+            "$inc": {"recipients": inserted},
+            "$set": {"status": "running"}
+        }
+    )
+
+
+async def run_campaigns():
+    now_utc = datetime.now(timezone.utc)
+    await db.campaigns.update_many(
+        {"status": {"$in": ["scheduled", "running"]}, "ends_at": {"$lte": now_utc}},
+        {"$set": {"status": "completed"}}
+    )
+    campaigns = db.campaigns.find({"status": {"$in": ["scheduled", "running"]}})
+    async for campaign in campaigns:
+        try:
+            await fan_out_campaign(campaign, now_utc)
+        except Exception as e:
+            logger.warning("Campaign %s fan-out failed: %s", campaign["_id"], e)
+
+
+def start_campaign_scheduler():
+    scheduler.add_job(
+        run_campaigns,
+        "interval",
+        minutes=5,
+        id="run_campaigns",
+        replace_existing=True
+    )
@@ -2,19 +2,13 @@ from fastapi import HTTPException, status, Body
 from app.db.mongo import db
 from bson import ObjectId
 from datetime import datetime
-from app.utils.helper import fetch_profile_details, get_or_fetch_astrology_data, markdown_to_plain, get_zodiac_sign
+from app.utils.helper import fetch_profile_details, get_or_fetch_astrology_data, get_zodiac_sign
 from app.services.astrology_service import generate_report_from_ai
 from app.services.subscription_service import deduct_user_credits
-from app.clients.gemini_client import client
 from app.utils.mongo import convert_mongo
-from app.core.concurrency import llm_semaphore
-from app.utils.concurrency import generate_with_retry
-from google.genai import types
-from fpdf import FPDF
-import io
-import re
+from app.utils.llm import generate_content
+from app.utils.report_artifacts import store_report_pdf, report_pdf_download
 import json
-from app.clients.aws import s3_client, S3_BUCKET
 
 
 async def add_compatibility_prompt(payload):
@@ -141,7 +135,7 @@ async def fetch_user_compatibility_reports(user_id):
             detail=f"Error while fetching user compatibility reports from db: {str(e)}"
         ) 
 
-async def save_compatibility_user_report(user_id, compatibility_id, profile_id, is_comparison, file_url, report_text):
+async def save_compatibility_user_report(user_id, compatibility_id, profile_id, is_comparison, file_url, report_text, storage_key=None):
     profile_ids = [ObjectId(pid) if isinstance(pid, str) else pid for pid in profile_id]
     saved_report = await db.user_compatibility_reports.insert_one({
         "user_id": ObjectId(user_id),
@@ -150,6 +144,7 @@ async def save_compatibility_user_report(user_id, compatibility_id, profile_id,
         "is_comparison": is_comparison,
         "pdf_report": file_url,
         "report_text": report_text,  
+        "storage_key": storage_key,
         "created_at": datetime.utcnow()
     })
     return saved_report
@@ -169,13 +164,19 @@ async def generate_compatibility_report(user_id, payload, pdf_report, report_typ
         cursor = db.user_compatibility_reports.find({
             "user_id": ObjectId(user_id),
             "compatibility_id": ObjectId(compatibility_doc["_id"]),
-            "pdf_report": {"$ne": None},
+            "report_text": {"$ne": None},
             "profile_id": {"$all": profile_ids, "$size": len(profile_ids)} 
 
         })
         existing_docs = await cursor.to_list(length=None)
         if existing_docs:
-            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=f"{report_type} Report For These Profiles Already Exists")
+            # Repeats return the stored report instead of generating (and charging) again.
+            existing = existing_docs[0]
+            return {
+                "report_id": str(existing["_id"]),
+                "report_text": existing["report_text"],
+                "pdf": await fetch_compatibility_report_pdf(user_id, existing["_id"]) if pdf_report else None
+            }
         
         for profile in payload.profile_id:
             profile_details = await fetch_profile_details(user_id, profile)
@@ -199,149 +200,61 @@ async def generate_compatibility_report(user_id, payload, pdf_report, report_typ
             f"Respond in {language} language."
         ]
 
-        config = types.GenerateContentConfig(
-        temperature = 1.0,
-        max_output_tokens = 6000,
-        system_instruction = prompt
+        response = await generate_content(
+            "compatibility_report",
+            contents,
+            system_instruction=prompt,
+            user_id=user_id,
         )
-        async with llm_semaphore:
-            response = await generate_with_retry(
-                lambda: client.aio.models.generate_content(
-                    model="gemini-3-flash-preview",
-                    contents=contents,
-                    config=config,
-                )
-            )
         await deduct_user_credits(user_id, 10, "1 Report Consumed")
         report_text = response.text
-        if not pdf_report or pdf_report is False:
-            return report_text
-
-        safe_text = markdown_to_plain(report_text)
-
-        pdf = FPDF()
-        pdf.set_auto_page_break(auto=True, margin=15)
-        pdf.set_left_margin(15)
-        pdf.set_right_margin(15)
-        pdf.add_page()
-
-        pdf.add_font(
-            "NotoSans",
-            "",
-            "app/deps/fonts/NotoSans-Regular.ttf",
-            uni=True,
-        )
-        pdf.add_font(
-            "NotoSans",
-            "I",
-            "app/deps/fonts/NotoSans-Italic.ttf",
-            uni=True,
-        )
-        pdf.add_font(
-            "NotoSans",
-            "B",
-            "app/deps/fonts/NotoSans-Bold.ttf",
-            uni=True,
-        )
-
-        # Title
-        pdf.set_font("NotoSans", "B", 16)
-        pdf.cell(0, 10, f"{type} {report_type} Report", ln=True, align="C")
-        pdf.ln(10)
-
-        pdf.set_font("NotoSans", "", 12)
-
-        lines = report_text.split("\n")
-        for line in lines:
-            line = line.strip()
-
-            if not line:
-                pdf.ln(5)
-                continue
-
-            # H1 / H2 style (## Heading)
-            if line.startswith("## "):
-                pdf.set_font("NotoSans", "B", 15)
-                pdf.multi_cell(0, 10, line.replace("## ", ""))
-                pdf.ln(4)
-                pdf.set_font("NotoSans", "", 12)
-                continue
-
-            # H3 style (### Heading)
-            if line.startswith("### "):
-                pdf.set_font("NotoSans", "B", 13)
-                pdf.multi_cell(0, 8, line.replace("### ", ""))
-                pdf.ln(3)
-                pdf.set_font("NotoSans", "", 12)
-                continue
-
-            # Bold inline text (**text**)
-            bold_parts = re.split(r'(\*\*.*?\*\*)', line)
-
-            for part in bold_parts:
-                if part.startswith("**") and part.endswith("**"):
-                    pdf.set_font("NotoSans", "B", 12)
-                    pdf.write(8, part.replace("**", ""))
-                    pdf.set_font("NotoSans", "", 12)
-                else:
-                    pdf.write(8, part)
-
-            pdf.ln(8)
-
-        pdf.ln(5)
-
-        if pdf.get_y() > 260:
-            pdf.add_page()
-
-        pdf.set_font("NotoSans", "I", 10)
-        pdf.cell(
-            0,
-            10,
-            f"Generated on {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}",
-            align="R",
-        )
-
-        pdf_raw = pdf.output(dest="S")
-        if isinstance(pdf_raw, str):
-            pdf_bytes = pdf_raw.encode("latin1")
-        else:
-            pdf_bytes = bytes(pdf_raw)
-
-        pdf_buffer = io.BytesIO(pdf_bytes)
-        pdf_buffer.seek(0)
+        # The PDF is rendered on first download, see fetch_compatibility_report_pdf.
+        saved_report = await save_compatibility_user_report(user_id, compatibility_doc["_id"], payload.profile_id, payload.is_comparison, None, report_text)
+        return {
+            "report_id": str(saved_report.inserted_id),
+            "report_text": report_text,
+            "pdf": await fetch_compatibility_report_pdf(user_id, saved_report.inserted_id) if pdf_report else None
+        }
 
-        filename = f"compatibility_report_{datetime.now().strftime('%Y%m%d%H%M%S')}.pdf"
-        s3_key = f"compatibility_reports/{filename}"
 
-        s3_client.upload_fileobj(
-            Fileobj=pdf_buffer,
-            Bucket=S3_BUCKET,
-            Key=s3_key,
-            ExtraArgs={"ContentType": "application/pdf"},
+    except HTTPException as http_err:
+        raise http_err
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Error while generating compatibility report: {str(e)}"
         )
+    
 
-        file_url = f"https://{S3_BUCKET}.s3.amazonaws.com/{s3_key}"
-        saved_report = await save_compatibility_user_report(user_id, compatibility_doc["_id"], payload.profile_id, payload.is_comparison, file_url, report_text)
-
-        chat_doc = {
-            "report_id": saved_report.inserted_id,
-            "user_id": ObjectId(user_id),
-            "messages": [],
-            "created_at": datetime.utcnow(),
-            "updated_at": datetime.utcnow()
-        }
-
-        return file_url
 
+async def fetch_compatibility_report_pdf(user_id, report_id):
+    try:
+        user_report = await db.user_compatibility_reports.find_one({
+            "_id": ObjectId(report_id),
+            "user_id": ObjectId(user_id)
+        })
+        if not user_report or not user_report.get("report_text"):
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Report Not Found")
+
+        storage_key = user_report.get("storage_key")
+        if not storage_key:
+            compatibility_doc = await db.compatibilities.find_one({"_id": user_report["compatibility_id"]}, {"type": 1})
+            report_type = "Comparison" if user_report.get("is_comparison") else "Compatibility"
+            title = f"{(compatibility_doc or {}).get('type', '')} {report_type} Report".strip()
+            storage_key, file_url = await store_report_pdf("compatibility_reports", user_report["report_text"], title)
+            await db.user_compatibility_reports.update_one(
+                {"_id": user_report["_id"]},
+                {"$set": {"pdf_report": file_url, "storage_key": storage_key}}
+            )
 
+        return await report_pdf_download(storage_key)
     except HTTPException as http_err:
         raise http_err
     except Exception as e:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            detail=f"Error while generating compatibility report: {str(e)}"
+            detail=f"Error while fetching compatibility report pdf: {str(e)}"
         )
-    
 
 
 async def fetch_question_about_report(user_id, report_id, profile_id, payload, compatibility_report, language):
@@ -414,15 +327,11 @@ async def fetch_question_about_report(user_id, report_id, profile_id, payload, c
             "content": payload.user_question
         })
 
-        async with llm_semaphore:
-            response = await generate_with_retry(
-                lambda: client.aio.models.generate_content(
-                    model="gemini-3-flash-preview",
-                    contents=[m["content"] for m in messages],
-                    config=types.GenerateContentConfig(
-                        temperature=1.0,
-                )
-            ))
+        response = await generate_content(
+            "report_chat",
+            [m["content"] for m in messages],
+            user_id=user_id,
+        )
 
         ai_reply = response.text
 
@@ -477,7 +386,7 @@ async def fetch_report_chat(user_id, report_id, profile_id, compatibility_report
             query["profile_id"] = ObjectId(profile_id)
         report_chat = await chat_collection.find_one(query)
         if not report_chat:
-            report, conversation_id = await generate_report_from_ai(report_id, user_id, profile_id, False, language)
+            report, conversation_id = await generate_report_from_ai(report_id, user_id, profile_id, language)
         else:
             conversation_id = report_chat["_id"]
         cursor = db.chat_history.find({"conversation_id": ObjectId(conversation_id), "user_id": ObjectId(user_id)})
@@ -51,6 +51,8 @@ async def delete_conversation_from_db(id, user_id):
     try:
         await db.conversations.delete_one({"_id": ObjectId(id), "user_id": ObjectId(user_id)})
         await db.chat_history.delete_many({"conversation_id": ObjectId(id), "user_id": ObjectId(user_id)})
+        await db.conversation_memory.delete_one({"conversation_id": ObjectId(id), "user_id": ObjectId(user_id)})
+        await db.profile_summaries.delete_many({"user_id": ObjectId(user_id)})
     except HTTPException as http_err:
         raise http_err
     except Exception as e:
@@ -64,6 +66,8 @@ async def delete_all_user_conversations(user_id):
     try:
         await db.conversations.delete_many({"user_id": ObjectId(user_id)})
         await db.chat_history.delete_many({"user_id": ObjectId(user_id)})
+        await db.conversation_memory.delete_many({"user_id": ObjectId(user_id)})
+        await db.profile_summaries.delete_many({"user_id": ObjectId(user_id)})
     except HTTPException as http_err:
         raise http_err
     except Exception as e:
@@ -0,0 +1,126 @@
+from fastapi import HTTPException, status
+from app.db.mongo import db
+from datetime import datetime, timedelta
+from app.utils.llm import load_llm_routes, MODEL_TIERS, DEFAULT_LLM_ROUTES
+from app.utils.mongo import convert_mongo
+from app.utils.llm_metrics import get_llm_task_metrics
+
+
+async def fetch_llm_routes():
+    try:
+        routes = await load_llm_routes(force=True)
+        return {"tiers": MODEL_TIERS, "routes": routes}
+    except HTTPException as http_err:
+        raise http_err
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Error while fetching llm routes: {str(e)}"
+        )
+
+
+async def update_llm_route(task, update_data):
+    try:
+        if task not in DEFAULT_LLM_ROUTES:
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=f"Unknown LLM task: {task}")
+        # Only the token budgets have a meaningful "unset" (no cap, model default thinking).
+        if any(value is None for field, value in update_data.items() if field not in ("max_output_tokens", "thinking_budget")):
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Only max_output_tokens and thinking_budget can be null")
+        if "tier" in update_data and update_data["tier"] not in MODEL_TIERS:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=f"Tier must be one of {list(MODEL_TIERS.keys())}")
+
+        update_data["updated_at"] = datetime.utcnow()
+        await db.llm_routes.update_one(
+            {"task": task},
+            {"$set": update_data},
+            upsert=True
+        )
+        routes = await load_llm_routes(force=True)
+        return routes.get(task)
+    except HTTPException as http_err:
+        raise http_err
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Error while updating llm route: {str(e)}"
+        )
+
+
+async def fetch_llm_metrics():
+    try:
+        return get_llm_task_metrics()
+    except HTTPException as http_err:
+        raise http_err
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Error while fetching llm metrics: {str(e)}"
+        )
+
+
+async def fetch_llm_usage_report(since_hours: int = 24, group_by: str = "task"):
+    try:
+        if group_by not in ("task", "user"):
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="group_by must be 'task' or 'user'")
+
+        since = datetime.utcnow() - timedelta(hours=since_hours)
+        pipeline = [
+            {"$match": {"created_at": {"$gte": since}}},
+            {
+                "$group": {
+                    "_id": "$task" if group_by == "task" else "$user_id",
+                    "calls": {"$sum": 1},
+                    "errors": {"$sum": {"$cond": [{"$eq": ["$status", "failed"]}, 1, 0]}},
+                    "retries": {"$sum": "$retries"},
+                    "hedges": {"$sum": "$hedges"},
+                    "failovers": {"$sum": "$failovers"},
+                    "input_tokens": {"$sum": "$input_tokens"},
+                    "output_tokens": {"$sum": "$output_tokens"},
+                    "cost_usd": {"$sum": "$cost_usd"},
+                    "avg_queue_wait_ms": {"$avg": "$queue_wait_ms"},
+                    "max_queue_wait_ms": {"$max": "$queue_wait_ms"},
+                    "avg_upstream_ms": {"$avg": "$upstream_ms"},
+                    "max_upstream_ms": {"$max": "$upstream_ms"},
+                    "avg_total_ms": {"$avg": "$total_ms"}
+                }
+            },
+            {"$sort": {"cost_usd": -1}},
+            {"$limit": 100}
+        ]
+
+        if group_by == "user":
+            pipeline.extend([
+                {
+                    "$lookup": {
+                        "from": "users",
+                        "localField": "_id",
+                        "foreignField": "_id",
+                        "pipeline": [{"$project": {"name": 1}}],
+                        "as": "user"
+                    }
+                },
+                {"$unwind": {"path": "$user", "preserveNullAndEmptyArrays": True}},
+                {"$addFields": {"user_name": "$user.name"}},
+                {"$project": {"user": 0}}
+            ])
+
+        usage = await db.llm_calls.aggregate(pipeline).to_list(length=None)
+        for row in usage:
+            row["cost_usd"] = round(row["cost_usd"], 4)
+            for field in ("avg_queue_wait_ms", "avg_upstream_ms", "avg_total_ms"):
+                if row.get(field) is not None:
+                    row[field] = round(row[field])
+
+        return {
+            "since": since,
+            "group_by": group_by,
+            "usage": convert_mongo(usage),
+            "live": get_llm_task_metrics()
+        }
+    except HTTPException as http_err:
+        raise http_err
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Error while fetching llm usage report: {str(e)}"
+        )
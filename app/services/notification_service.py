@@ -1,13 +1,49 @@
 from app.db.mongo import db
 from bson import ObjectId
-from datetime import datetime, timezone
+from datetime import datetime, timezone, timedelta
 from fastapi import HTTPException, status
 from app.utils.mongo import convert_mongo
 from apscheduler.schedulers.asyncio import AsyncIOScheduler
-from app.clients.firebase import send_push_notification
-from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
+from pymongo import UpdateMany, UpdateOne
+from collections import Counter
+from pymongo.errors import BulkWriteError, OperationFailure
+from app.clients.firebase import send_push_notification, send_push_batch
+from zoneinfo import ZoneInfo, available_timezones
+from functools import lru_cache
 import random
 import asyncio
+import logging
+import os
+import socket
+import uuid
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_TIMEZONE = "Asia/Kolkata"
+# Pending notifications delivered per round of push_pending_notifications.
+PUSH_BATCH_NOTIFICATIONS = int(os.getenv("PUSH_BATCH_NOTIFICATIONS", "2000"))
+# Seconds between sweeps when change streams are unavailable (standalone mongod, local setups).
+PUSH_POLL_SECONDS = float(os.getenv("PUSH_POLL_SECONDS", "5"))
+PUSH_DISPATCHER_STATE_ID = "push_dispatcher"
+# The resume token advances on idle streams too; saving it keeps a restart within the oplog window.
+PUSH_RESUME_TOKEN_SAVE_SECONDS = float(os.getenv("PUSH_RESUME_TOKEN_SAVE_SECONDS", "60"))
+# Server error codes: change streams need a replica set; the resume token fell off the oplog.
+CHANGE_STREAMS_UNSUPPORTED = (40573,)
+CHANGE_STREAM_HISTORY_LOST = (136, 280, 286)
+# Inactive devices are deleted after DEVICE_RETENTION_DAYS; active ones not re-registered for DEVICE_STALE_DAYS are deactivated.
+DEVICE_RETENTION_DAYS = int(os.getenv("DEVICE_RETENTION_DAYS", "30"))
+DEVICE_STALE_DAYS = int(os.getenv("DEVICE_STALE_DAYS", "60"))
+# A claimed batch not finished within the lease (e.g. the sender died) is picked up again by another sender.
+PUSH_LEASE_SECONDS = int(os.getenv("PUSH_LEASE_SECONDS", "120"))
+# Delivered (or undeliverable) notifications older than this are removed from inboxes.
+NOTIFICATION_RETENTION_DAYS = int(os.getenv("NOTIFICATION_RETENTION_DAYS", "90"))
+FINAL_STATUSES = ["sent", "failed", "skipped", "cancelled"]
+INBOX_PAGE_SIZE = 20
+INBOX_MAX_PAGE_SIZE = 100
+# Filtered admin feed totals are counted at most once per window.
+ADMIN_COUNT_CACHE_SECONDS = int(os.getenv("ADMIN_COUNT_CACHE_SECONDS", "60"))
+# A local-hour notification goes out during the first minutes of the hour, one cycle must fall inside it.
+LOCAL_HOUR_WINDOW_MINUTES = 10
 
 
 async def create_notification(user_id: str, title: str, message: str, type: str = "general"):
@@ -24,50 +60,68 @@ async def create_notification(user_id: str, title: str, message: str, type: str
     }
     result = await db.notifications.insert_one(notif)
     notif["_id"] = result.inserted_id
+    await _bump_unread_counts({notif["user_id"]: 1})
     return notif
 
 
-async def create_notification_for_users_at_local_hour(title: str, message: str, target_hour: int, type: str):
-    now_utc = datetime.now(timezone.utc)
- 
+async def _bump_unread_counts(deltas):
+    """
+    Applies {user_id: delta} to users.unread_notifications. Users without
+    the field are skipped; fetch_unread_count counts theirs on first read.
+    """
+    requests = [
+        UpdateOne({"_id": user_id, "unread_notifications": {"$exists": True}}, {"$inc": {"unread_notifications": delta}})
+        for user_id, delta in deltas.items() if delta
+    ]
+    if requests:
+        await db.users.bulk_write(requests, ordered=False)
+
+
+@lru_cache(maxsize=1)
+def _all_zones():
+    return tuple(ZoneInfo(name) for name in sorted(available_timezones()))
+
+
+def zones_at_local_hour(now_utc, target_hour):
+    """
+    Returns {zone name: local date} for every IANA zone whose local time is
+    within the first LOCAL_HOUR_WINDOW_MINUTES of target_hour.
+    """
+    zones = {}
+    for tz in _all_zones():
+        local_time = now_utc.astimezone(tz)
+        if local_time.hour != target_hour or local_time.minute >= LOCAL_HOUR_WINDOW_MINUTES:
+            continue
+        zones[tz.key] = local_time.date().isoformat()
+    return zones
+
+
+def timezone_filter(zones):
+    clauses = [{"timezone": {"$in": list(zones)}}]
+    if DEFAULT_TIMEZONE in zones:
+        clauses.append({"timezone": {"$exists": False}})
+    return clauses
+
+
+async def create_notification_for_users_at_local_hour(title: str, message: str, target_hour: int, type: str, now_utc=None):
+    now_utc = now_utc or datetime.now(timezone.utc)
+    zones = zones_at_local_hour(now_utc, target_hour)
+    if not zones:
+        return
+
     users = db.users.find(
-        {"role": "user", "is_enabled": True, "is_onboarded": True},
+        {"role": "user", "is_enabled": True, "is_onboarded": True, "$or": timezone_filter(zones)},
         {"_id": 1, "timezone": 1}
     )
- 
+
     notifications = []
     async for user in users:
-        tz_str = user.get("timezone", "Asia/Kolkata")
-        if not tz_str:
-            continue
- 
-        try:
-            user_tz = ZoneInfo(tz_str)
-        except ZoneInfoNotFoundError:
-            continue
- 
-        local_time = now_utc.astimezone(user_tz)
-
-        if local_time.hour != target_hour or local_time.minute >= 10:
-            continue
-
-        start_of_day_local = local_time.replace(hour=0, minute=0, second=0, microsecond=0)
-        start_of_day_utc = start_of_day_local.astimezone(timezone.utc)
-        
-        already_sent = await db.notifications.find_one({
-            "user_id": user["_id"],
-            "type": type,  
-            "created_at": {"$gte": start_of_day_utc}
-        })
-
-        if already_sent:
-            continue
- 
         notifications.append({
             "user_id": user["_id"],
             "title": title,
             "message": message,
             "type": type,
+            "local_date": zones[user.get("timezone", DEFAULT_TIMEZONE)],
             "status": "pending",
             "send_at": now_utc,
             "is_read": False,
@@ -75,7 +129,25 @@ async def create_notification_for_users_at_local_hour(title: str, message: str,
         })
  
     if notifications:
-        await db.notifications.insert_many(notifications)
+        await insert_daily_notifications(notifications)
+
+
+async def insert_daily_notifications(notifications):
+    """
+    The unique (user_id, type, local_date) index drops anything already sent
+    today; an unordered insert keeps going past those duplicates.
+    """
+    try:
+        await db.notifications.insert_many(notifications, ordered=False)
+        duplicates = set()
+    except BulkWriteError as e:
+        if any(error["code"] != 11000 for error in e.details.get("writeErrors", [])):
+            raise
+        duplicates = {error["index"] for error in e.details["writeErrors"]}
+
+    inserted = [notif for i, notif in enumerate(notifications) if i not in duplicates]
+    await _bump_unread_counts(Counter(notif["user_id"] for notif in inserted))
+    return len(inserted)
 
 scheduler = AsyncIOScheduler()
 
@@ -95,50 +167,213 @@ async def push_test_notification_to_device(payload, user_id):
         except Exception:
             raise Exception
 
+async def claim_pending_notifications(claim_token):
+    """
+    Marks up to PUSH_BATCH_NOTIFICATIONS due notifications as being sent by
+    this claim_token and returns them. The update re-checks the claimable
+    condition, so a notification claimed by a concurrent sender in between
+    is left out rather than sent twice.
+    """
+    now = datetime.now(timezone.utc)
+    claimable = {
+        "$or": [
+            {"status": "pending", "send_at": {"$lte": now}},
+            {"status": "sending", "lease_expires_at": {"$lt": now}}
+        ]
+    }
+    candidates = await db.notifications.find(claimable, {"_id": 1}).limit(PUSH_BATCH_NOTIFICATIONS).to_list(length=None)
+    if not candidates:
+        return []
+
+    await db.notifications.update_many(
+        {"_id": {"$in": [c["_id"] for c in candidates]}, **claimable},
+        {"$set": {
+            "status": "sending",
+            "claim_token": claim_token,
+            "lease_expires_at": now + timedelta(seconds=PUSH_LEASE_SECONDS)
+        }}
+    )
+    # The $type clause mirrors the partial claim_token index so the planner can use it.
+    return await db.notifications.find(
+        {"claim_token": {"$eq": claim_token, "$type": "string"}, "status": "sending"},
+        {"_id": 1, "user_id": 1, "title": 1, "message": 1, "platform": 1}
+    ).to_list(length=None)
+
+
 async def push_pending_notifications():
-    print("Running push_pending_notifications")
-    pending = db.notifications.find({
-        "status": "pending",
-        "send_at": {"$lte": datetime.now(timezone.utc)}
-    })
+    sender_id = f"{socket.gethostname()}:{os.getpid()}"
+    while True:
+        claim_token = f"{sender_id}:{uuid.uuid4().hex}"
+        claimed = await claim_pending_notifications(claim_token)
+        if not claimed:
+            return
+
+        await deliver_notifications(claimed, claim_token)
+        if len(claimed) < PUSH_BATCH_NOTIFICATIONS:
+            return
+
+
+async def deliver_notifications(notifications, claim_token):
+    """
+    Sends a claimed batch of notifications to every active device of their
+    users with batched FCM calls, then records the outcome in one bulk write.
+    """
+    user_ids = list({notif["user_id"] for notif in notifications})
+    enabled = set(await db.users.distinct("_id", {"_id": {"$in": user_ids}, "is_push_notifications_enabled": True}))
+
+    tokens_by_user = {}
+    devices = db.user_devices.find(
+        {"user_id": {"$in": list(enabled)}, "is_active": True},
+        {"user_id": 1, "device_token": 1, "platform": 1}
+    )
+    async for device in devices:
+        if device.get("device_token"):
+            tokens_by_user.setdefault(device["user_id"], []).append((device["device_token"], device.get("platform")))
+
+    messages = []
+    owners = []
+    skipped_ids = []
+    for notif in notifications:
+        if notif["user_id"] not in enabled:
+            skipped_ids.append(notif["_id"])
+            continue
+        for token, platform in tokens_by_user.get(notif["user_id"], []):
+            if notif.get("platform") and platform != notif["platform"]:
+                continue
+            messages.append((token, notif["title"], notif["message"], None))
+            owners.append(notif["_id"])
+
+    results = await send_push_batch(messages) if messages else []
+    await deactivate_dead_tokens(messages, results)
+    delivered = {owner for owner, result in zip(owners, results) if result["success"]}
+    failed_ids = [
+        notif["_id"] for notif in notifications
+        if notif["user_id"] in enabled and notif["_id"] not in delivered
+    ]
+
+    # Unset rather than nulled, so only claimed notifications sit in the claim_token index.
+    release = {"claim_token": "", "lease_expires_at": ""}
+    outcomes = [
+        (list(delivered), {"status": "sent", "sent_at": datetime.now(timezone.utc)}),
+        (failed_ids, {"status": "failed"}),
+        (skipped_ids, {"status": "skipped"})
+    ]
+    # Filtering on the claim token keeps a sender whose lease ran out from overwriting the new owner's result.
+    requests = [
+        UpdateMany({"_id": {"$in": ids}, "claim_token": claim_token}, {"$set": update, "$unset": release})
+        for ids, update in outcomes if ids
+    ]
+    if requests:
+        await db.notifications.bulk_write(requests, ordered=False)
+
+
+async def _save_resume_token(token):
+    await db.dispatcher_state.update_one(
+        {"_id": PUSH_DISPATCHER_STATE_ID},
+        {"$set": {"resume_token": token, "updated_at": datetime.utcnow()}},
+        upsert=True
+    )
 
-    async for notif in pending:
-        user = await db.users.find_one({
-            "_id": notif["user_id"],
-            "is_push_notifications_enabled": True
-        })
 
-        if not user:
-            continue  
+async def _watch_notification_inserts():
+    state = await db.dispatcher_state.find_one({"_id": PUSH_DISPATCHER_STATE_ID}) or {}
+    pipeline = [{"$match": {"operationType": "insert", "fullDocument.status": "pending"}}]
+
+    async with db.notifications.watch(pipeline, resume_after=state.get("resume_token"), max_await_time_ms=1000) as stream:
+        logger.info("Push dispatcher watching notification inserts")
+        # Anything inserted while the dispatcher was down and not covered by the resume token.
+        await push_pending_notifications()
+        saved_at = asyncio.get_running_loop().time()
+        while stream.alive:
+            change = await stream.try_next()
+            if change is None:
+                if asyncio.get_running_loop().time() - saved_at >= PUSH_RESUME_TOKEN_SAVE_SECONDS:
+                    await _save_resume_token(stream.resume_token)
+                    saved_at = asyncio.get_running_loop().time()
+                continue
+            # Drain up to a batch of further inserts so one claim covers a whole burst.
+            drained = 1
+            while change is not None and drained < PUSH_BATCH_NOTIFICATIONS:
+                change = await stream.try_next()
+                drained += 1
+            await push_pending_notifications()
+            await _save_resume_token(stream.resume_token)
+            saved_at = asyncio.get_running_loop().time()
+
+
+async def _poll_pending_notifications():
+    logger.info("Push dispatcher polling every %s seconds", PUSH_POLL_SECONDS)
+    while True:
+        try:
+            await push_pending_notifications()
+        except Exception as e:
+            logger.warning("Push dispatcher poll failed: %s", e)
+        await asyncio.sleep(PUSH_POLL_SECONDS)
 
-        devices = db.user_devices.find({
-            "user_id": notif["user_id"],
-            "is_active": True
-        })
 
-        success = False
-
-        async for device in devices:
-            try:
-                await send_push_notification(
-                    device["device_token"],
-                    notif["title"],
-                    notif["message"]
-                )
-                success = True
-            except Exception:
+async def sweep_pending_notifications():
+    logger.info("Running push_pending_notifications")
+    await push_pending_notifications()
+
+
+async def run_push_dispatcher():
+    """
+    Pushes notifications as soon as they are inserted by tailing a change
+    stream on notifications. Falls back to polling every PUSH_POLL_SECONDS
+    when the server has no change streams.
+    """
+    while True:
+        try:
+            await _watch_notification_inserts()
+        except OperationFailure as e:
+            if e.code in CHANGE_STREAMS_UNSUPPORTED:
+                await _poll_pending_notifications()
+                return
+            if e.code in CHANGE_STREAM_HISTORY_LOST:
+                logger.warning("Push dispatcher resume token expired, starting from now")
+                await _save_resume_token(None)
                 continue
+            logger.warning("Push dispatcher change stream failed: %s", e)
+        except Exception as e:
+            # Delivery errors (FCM, bad data) must not end the scheduler process; claims
+            # left behind are picked up again once their lease runs out.
+            logger.exception("Push dispatcher failed: %s", e)
+        await asyncio.sleep(PUSH_POLL_SECONDS)
+
+
+async def deactivate_dead_tokens(messages, results):
+    dead_tokens = list({
+        message[0] for message, result in zip(messages, results)
+        if isinstance(result, dict) and result.get("delete_token")
+    })
+    if dead_tokens:
+        await db.user_devices.update_many(
+            {"device_token": {"$in": dead_tokens}},
+            {"$set": {"is_active": False, "updated_at": datetime.utcnow()}}
+        )
 
-        if success:
-            await db.notifications.update_one(
-                {"_id": notif["_id"]},
-                {"$set": {"status": "sent", "sent_at": datetime.now(timezone.utc)}}
-            )
-        else:
-            await db.notifications.update_one(
-                {"_id": notif["_id"]},
-                {"$set": {"status": "failed"}}
-            )
+
+async def purge_stale_devices():
+    now = datetime.utcnow()
+    await db.user_devices.update_many(
+        {"is_active": True, "updated_at": {"$lt": now - timedelta(days=DEVICE_STALE_DAYS)}},
+        {"$set": {"is_active": False, "updated_at": now}}
+    )
+    await db.user_devices.delete_many(
+        {"is_active": False, "updated_at": {"$lt": now - timedelta(days=DEVICE_RETENTION_DAYS)}}
+    )
+
+
+async def purge_old_notifications():
+    expired = {
+        "status": {"$in": FINAL_STATUSES},
+        "created_at": {"$lt": datetime.now(timezone.utc) - timedelta(days=NOTIFICATION_RETENTION_DAYS)}
+    }
+    # Counters of users losing unread notifications are dropped and recounted on their next read.
+    user_ids = await db.notifications.distinct("user_id", {**expired, "is_read": False})
+    await db.notifications.delete_many(expired)
+    if user_ids:
+        await db.users.update_many({"_id": {"$in": user_ids}}, {"$unset": {"unread_notifications": ""}})
 
 
 async def notification_cycle():
@@ -194,23 +429,111 @@ def start_scheduler():
             replace_existing=True
         )
 
+        # Safety sweep next to run_push_dispatcher: future send_at values and expired claims.
         scheduler.add_job(
-            push_pending_notifications,
+            sweep_pending_notifications,
             "interval",
             minutes=1,
             id="push_notifications",
             replace_existing=True,
             max_instances=3  
         )
+
+        scheduler.add_job(
+            purge_stale_devices,
+            "interval",
+            hours=24,
+            id="purge_stale_devices",
+            replace_existing=True
+        )
+
+        scheduler.add_job(
+            purge_old_notifications,
+            "interval",
+            hours=24,
+            id="purge_old_notifications",
+            replace_existing=True
+        )
         scheduler.start()
 
-async def fetch_notifications(user_id):
+def _inbox_cursor(notification):
+    return f"{notification['created_at'].isoformat()}_{notification['_id']}"
+
+
+def _cursor_filter(cursor):
+    if not cursor:
+        return {}
+    try:
+        created_at, last_id = cursor.rsplit("_", 1)
+        created_at, last_id = datetime.fromisoformat(created_at), ObjectId(last_id)
+    except Exception:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid Cursor")
+    return {
+        "$or": [
+            {"created_at": {"$lt": created_at}},
+            {"created_at": created_at, "_id": {"$lt": last_id}}
+        ]
+    }
+
+
+_admin_counts = {}
+
+
+async def _cached_notification_count(query):
+    if not query:
+        return await db.notifications.estimated_document_count()
+
+    key = repr(sorted(query.items()))
+    cached = _admin_counts.get(key)
+    now = datetime.now(timezone.utc)
+    if cached and cached[1] > now:
+        return cached[0]
+
+    count = await db.notifications.count_documents(query)
+    for stale in [k for k, (_, expires_at) in _admin_counts.items() if expires_at <= now]:
+        del _admin_counts[stale]
+    _admin_counts[key] = (count, now + timedelta(seconds=ADMIN_COUNT_CACHE_SECONDS))
+    return count
+
+
+async def _read_watermark(user_id):
+    user = await db.users.find_one({"_id": ObjectId(user_id)}, {"notifications_read_at": 1})
+    return user.get("notifications_read_at") if user else None
+
+
+def _unread_filter(user_id, read_at):
+    """
+    A notification is read when its flag is set or it is not newer than the
+    user's notifications_read_at watermark from "mark all as read".
+    """
+    query = {"user_id": ObjectId(user_id), "is_read": False}
+    if read_at:
+        query["created_at"] = {"$gt": read_at}
+    return query
+
+
+async def fetch_notifications(user_id, limit=INBOX_PAGE_SIZE, cursor=None):
+    """
+    Returns one page of the user's inbox, newest first, and the cursor for
+    the next page (None on the last one).
+    """
     try:
-        cursor = db.notifications.find({"user_id": ObjectId(user_id)})
-        notifications = await cursor.to_list(length=None)
-        if not notifications:
+        query = {"user_id": ObjectId(user_id), **_cursor_filter(cursor)}
+        read_at = await _read_watermark(user_id)
+
+        limit = max(1, min(limit, INBOX_MAX_PAGE_SIZE))
+        notifications = await db.notifications.find(query).sort(
+            [("created_at", -1), ("_id", -1)]
+        ).limit(limit + 1).to_list(length=None)
+        if not notifications and not cursor:
             raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Notifications Not Found")
-        return convert_mongo(notifications)
+
+        next_cursor = _inbox_cursor(notifications[limit - 1]) if len(notifications) > limit else None
+        notifications = notifications[:limit]
+        if read_at:
+            for notification in notifications:
+                notification["is_read"] = notification["is_read"] or notification["created_at"] <= read_at
+        return convert_mongo(notifications), next_cursor
     except HTTPException as http_err:
         raise http_err
     except Exception as e:
@@ -220,16 +543,47 @@ async def fetch_notifications(user_id):
         )
     
 
+async def fetch_unread_count(user_id):
+    try:
+        user = await db.users.find_one({"_id": ObjectId(user_id)}, {"unread_notifications": 1, "notifications_read_at": 1})
+        if user and "unread_notifications" in user:
+            return max(0, user["unread_notifications"])
+
+        # _bump_unread_counts skips users without the counter, so a change landing between
+        # the count and the $set would be lost. A second count catches that; on a mismatch
+        # the counter is dropped again and the next read recounts.
+        read_at = user.get("notifications_read_at") if user else None
+        unread_filter = _unread_filter(user_id, read_at)
+        count = await db.notifications.count_documents(unread_filter)
+        result = await db.users.update_one(
+            {"_id": ObjectId(user_id), "unread_notifications": {"$exists": False}},
+            {"$set": {"unread_notifications": count}}
+        )
+        if result.modified_count:
+            recount = await db.notifications.count_documents(unread_filter)
+            if recount != count:
+                await db.users.update_one({"_id": ObjectId(user_id)}, {"$unset": {"unread_notifications": ""}})
+                return recount
+        return count
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Error while fetching unread notifications count: {str(e)}"
+        )
+
+
 async def mark_notification_as_read(id, user_id):
     try:
-        await db.notifications.update_one(
-            {"_id": ObjectId(id), "user_id": ObjectId(user_id)},
+        read_at = await _read_watermark(user_id)
+        result = await db.notifications.update_one(
+            {"_id": ObjectId(id), **_unread_filter(user_id, read_at)},
             {
                 "$set": {
                     "is_read": True
                 }
             }
         )
+        await _bump_unread_counts({ObjectId(user_id): -result.modified_count})
     except HTTPException as http_err:
         raise http_err
     except Exception as e:
@@ -241,11 +595,16 @@ async def mark_notification_as_read(id, user_id):
 
 async def mark_all_notifications_as_read(user_id):
     try:
-        await db.notifications.update_many(
-            {"user_id": ObjectId(user_id)},
+        await db.users.update_one(
+            {"_id": ObjectId(user_id)},
             {
                 "$set": {
-                    "is_read": True
+                    "notifications_read_at": datetime.utcnow()
+                },
+                # A bump racing the watermark could leave a zeroed counter off by one for good;
+                # without the field the next read recounts against the watermark.
+                "$unset": {
+                    "unread_notifications": ""
                 }
             }
         )
@@ -257,13 +616,13 @@ async def mark_all_notifications_as_read(user_id):
             detail=f"Error while marking all notifications as read: {str(e)}"
         )
 
-async def mark_all_notifications_as_read_on_dashboard():
+async def mark_all_notifications_as_read_on_dashboard(admin_id):
     try:
-        await db.notifications.update_many(
-            {},
+        await db.users.update_one(
+            {"_id": ObjectId(admin_id)},
             {
                 "$set": {
-                    "is_read": True
+                    "dashboard_notifications_seen_at": datetime.utcnow()
                 }
             }
         )
@@ -276,45 +635,70 @@ async def mark_all_notifications_as_read_on_dashboard():
         )
 
 
-async def fetch_notifications_for_admin():
+async def fetch_notifications_for_admin(admin_id, limit=INBOX_PAGE_SIZE, cursor=None, type=None, notification_status=None, user_id=None):
+    """
+    One page of all notifications for the admin dashboard, newest first.
+    Filtering, sorting and the limit run before the users lookup, so only
+    the page is joined. is_seen compares each notification against the
+    admin's own dashboard_notifications_seen_at watermark.
+    Returns (notifications, next_cursor, total).
+    """
     try:
+        query = {}
+        if type:
+            query["type"] = type
+        if notification_status:
+            query["status"] = notification_status
+        if user_id:
+            if not ObjectId.is_valid(user_id):
+                raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid User Id")
+            query["user_id"] = ObjectId(user_id)
+        total = await _cached_notification_count(query)
+        query.update(_cursor_filter(cursor))
+
+        limit = max(1, min(limit, INBOX_MAX_PAGE_SIZE))
         pipeline = [
+            {"$match": query},
+            {"$sort": {"created_at": -1, "_id": -1}},
+            {"$limit": limit + 1},
             {
                 "$lookup": {
                     "from": "users",
-                    "localField": "user_id",
-                    "foreignField": "_id",
+                    "let": {"user_id": "$user_id"},
+                    "pipeline": [
+                        {"$match": {"$expr": {"$eq": ["$_id", "$$user_id"]}}},
+                        {"$project": {"_id": 0, "name": 1}}
+                    ],
                     "as": "user"
                 }
             },
-            {
-                "$unwind": {
-                    "path": "$user",
-                    "preserveNullAndEmptyArrays": True
-                }
-            },
             {
                 "$addFields": {
-                    "user_name": "$user.name"
+                    "user_name": {"$first": "$user.name"}
                 }
             },
             {
                 "$project": {
-                    "user": 0 
+                    "user": 0
                 }
             }
         ]
 
-        cursor = db.notifications.aggregate(pipeline)
-        notifications = await cursor.to_list(length=None)
-
-        if not notifications:
+        notifications = await db.notifications.aggregate(pipeline).to_list(length=None)
+        if not notifications and not cursor:
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
                 detail="Notifications Not Found"
             )
 
-        return convert_mongo(notifications)
+        admin = await db.users.find_one({"_id": ObjectId(admin_id)}, {"dashboard_notifications_seen_at": 1})
+        seen_at = admin.get("dashboard_notifications_seen_at") if admin else None
+
+        next_cursor = _inbox_cursor(notifications[limit - 1]) if len(notifications) > limit else None
+        notifications = notifications[:limit]
+        for notification in notifications:
+            notification["is_seen"] = bool(seen_at) and notification["created_at"] <= seen_at
+        return convert_mongo(notifications), next_cursor, total
 
     except HTTPException as http_err:
         raise http_err
@@ -327,33 +711,23 @@ async def fetch_notifications_for_admin():
 
 async def register_user_device_in_db(payload, user_id):
     try:
-        existing = await db.user_devices.find_one({
-        "device_token": payload.device_token
-    })
-
-        if existing:
-            await db.user_devices.update_one(
-                {"_id": existing["_id"]},
-                {
-                    "$set": {
-                        "user_id": ObjectId(user_id),
-                        "platform": payload.platform,
-                        "is_active": True,
-                        "updated_at": datetime.utcnow()
-                    }
-                }
-            )
+        now = datetime.utcnow()
+        result = await db.user_devices.update_one(
+            {"device_token": payload.device_token},
+            {
+                "$set": {
+                    "user_id": ObjectId(user_id),
+                    "platform": payload.platform,
+                    "is_active": True,
+                    "updated_at": now
+                },
+                "$setOnInsert": {"created_at": now}
+            },
+            upsert=True
+        )
+        if result.matched_count:
             return {"message": "Device updated"}
 
-        await db.user_devices.insert_one({
-            "user_id": ObjectId(user_id),
-            "device_token": payload.device_token,
-            "platform": payload.platform,
-            "is_active": True,
-            "created_at": datetime.utcnow(),
-            "updated_at": datetime.utcnow()
-        })
-
     except HTTPException as http_err:
         raise http_err
     
@@ -364,117 +738,3 @@ async def register_user_device_in_db(payload, user_id):
         )
     
 
-async def fetch_dashboard_notifications():
-    try:
-        pipeline = [
-            {
-                "$lookup": {
-                    "from": "users",
-                    "localField": "user_id",
-                    "foreignField": "_id",
-                    "as": "user"
-                }
-            },
-            {
-                "$unwind": {
-                    "path": "$user",
-                    "preserveNullAndEmptyArrays": True
-                }
-            },
-            {
-                "$addFields": {
-                    "user_name": "$user.name"
-                }
-            },
-            {
-                "$project": {
-                    "user": 0  
-                }
-            }
-        ]
-
-        cursor = db.notifications.aggregate(pipeline)
-        notifications = await cursor.to_list(length=None)
-
-        if not notifications:
-            raise HTTPException(
-                status_code=status.HTTP_404_NOT_FOUND,
-                detail="Notifications Not Found"
-            )
-
-        return convert_mongo(notifications)
-
-    except HTTPException as http_err:
-        raise http_err
-    except Exception as e:
-        raise HTTPException(
-            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            detail=f"Error while fetching dashboard notifications from db: {str(e)}"
-        )
-    
-async def push_notifications_to_users_helper(payload, is_subscribed: bool):
-    try:
-        base_match = {
-            "role": "user",
-            "is_enabled": True,
-            "is_push_notifications_enabled": True
-        }
-
-        pipeline = [
-            {"$match": base_match}
-        ]
-
-        # ✅ Apply subscription filter using $lookup
-        if is_subscribed:
-            pipeline.extend([
-                {
-                    "$lookup": {
-                        "from": "user_subscriptions",
-                        "localField": "_id",
-                        "foreignField": "user_id",
-                        "as": "subscription"
-                    }
-                },
-                {
-                    "$match": {
-                        "subscription.0": {"$exists": True}
-                    }
-                }
-            ])
-
-        cursor = db.users.aggregate(pipeline)
-
-        async for user in cursor:
-            devices_cursor = db.user_devices.find({
-                "user_id": user["_id"],
-                "is_active": True
-            })
-
-            tokens = [
-                device["device_token"]
-                async for device in devices_cursor
-                if device.get("device_token")
-            ]
-
-            if not tokens:
-                continue
-
-            # 🚀 Send in parallel per user
-            tasks = [
-                send_push_notification(token, payload.title, payload.message)
-                for token in tokens
-            ]
-
-            results = await asyncio.gather(*tasks, return_exceptions=True)
-
-            for res in results:
-                if isinstance(res, Exception):
-                    print(f"Push failed: {res}")
-
-    except HTTPException as http_err:
-        raise http_err
-    except Exception as e:
-        raise HTTPException(
-            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            detail=f"Error while pushing notifications: {str(e)}"
-        )
\ No newline at end of file
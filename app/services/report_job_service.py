@@ -0,0 +1,347 @@
+from fastapi import HTTPException, status
+from app.db.mongo import db
+from bson import ObjectId
+from datetime import datetime, timedelta
+from pymongo import ReturnDocument
+from pymongo.errors import DuplicateKeyError
+from app.utils.mongo import convert_mongo
+from app.services.astrology_service import generate_report_from_ai
+from app.services.report_service import REPORT_CREDITS
+from app.services.subscription_service import deduct_user_credits, add_user_credits, fetch_user_coins
+import asyncio
+import json
+import logging
+import os
+import socket
+import uuid
+
+logger = logging.getLogger(__name__)
+
+REPORT_WORKERS = int(os.getenv("REPORT_WORKERS", "2"))
+REPORT_JOB_LEASE_SECONDS = int(os.getenv("REPORT_JOB_LEASE_SECONDS", "300"))
+REPORT_JOB_MAX_ATTEMPTS = int(os.getenv("REPORT_JOB_MAX_ATTEMPTS", "3"))
+REPORT_JOB_POLL_SECONDS = 1.0
+
+TERMINAL_STATUSES = ("succeeded", "failed")
+
+_workers = []
+
+
+def _idempotency_key(user_id, profile_id, report_id, language):
+    return f"{user_id}:{profile_id}:{report_id}:{language.lower()}"
+
+
+async def enqueue_report_job(report_id, user_id, profile_id, language):
+    try:
+        user_report = await db.user_reports.find_one({
+            "user_id": ObjectId(user_id),
+            "profile_id": ObjectId(profile_id),
+            "report_id": ObjectId(report_id)
+        })
+        if not user_report:
+            raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Forbidden")
+        if user_report.get("is_paid") is False and await fetch_user_coins(user_id) < REPORT_CREDITS:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Insufficient credits")
+
+        key = _idempotency_key(user_id, profile_id, report_id, language)
+        now = datetime.utcnow()
+        requeue = {
+            "$set": {
+                "status": "queued",
+                "stage": "queued",
+                "progress": 0,
+                "attempts": 0,
+                "error": None,
+                "lease_owner": None,
+                "lease_expires_at": None,
+                "updated_at": now
+            }
+        }
+
+        existing = await db.report_jobs.find_one({"idempotency_key": key})
+        if existing:
+            # A missing PDF never needs a regeneration; GET /report/user/{id}/pdf renders it from the saved text.
+            if existing["status"] != "failed":
+                return convert_mongo(existing)
+            job = await db.report_jobs.find_one_and_update(
+                {"_id": existing["_id"], "status": existing["status"]},
+                requeue,
+                return_document=ReturnDocument.AFTER
+            )
+            return convert_mongo(job or await db.report_jobs.find_one({"_id": existing["_id"]}))
+
+        job = {
+            "idempotency_key": key,
+            "user_id": ObjectId(user_id),
+            "profile_id": ObjectId(profile_id),
+            "report_id": ObjectId(report_id),
+            "language": language,
+            "status": "queued",
+            "stage": "queued",
+            "progress": 0,
+            "attempts": 0,
+            "result": None,
+            "error": None,
+            "lease_owner": None,
+            "lease_expires_at": None,
+            "created_at": now,
+            "updated_at": now
+        }
+        try:
+            result = await db.report_jobs.insert_one(job)
+            job["_id"] = result.inserted_id
+        except DuplicateKeyError:
+            job = await db.report_jobs.find_one({"idempotency_key": key})
+        return convert_mongo(job)
+    except HTTPException as http_err:
+        raise http_err
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Error while enqueueing report job: {str(e)}"
+        )
+
+
+async def fetch_report_job(job_id, user_id):
+    try:
+        job = await db.report_jobs.find_one(
+            {"_id": ObjectId(job_id), "user_id": ObjectId(user_id)},
+            {"lease_owner": 0, "lease_expires_at": 0, "idempotency_key": 0}
+        )
+        if not job:
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Report Job Not Found")
+        return convert_mongo(job)
+    except HTTPException as http_err:
+        raise http_err
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Error while fetching report job: {str(e)}"
+        )
+
+
+async def _claim_next_job(worker_id):
+    now = datetime.utcnow()
+    timed_out = {"status": "running", "lease_expires_at": {"$lt": now}, "attempts": {"$gte": REPORT_JOB_MAX_ATTEMPTS}}
+    async for expired in db.report_jobs.find(timed_out):
+        result = await db.report_jobs.update_one(
+            {"_id": expired["_id"], **timed_out},
+            {"$set": {"status": "failed", "stage": "failed", "error": "Report generation timed out", "lease_owner": None, "lease_expires_at": None, "updated_at": now}}
+        )
+        if result.modified_count:
+            await _refund_report(expired)
+    return await db.report_jobs.find_one_and_update(
+        {
+            "$or": [
+                {"status": "queued"},
+                {"status": "running", "lease_expires_at": {"$lt": now}}
+            ],
+            "attempts": {"$lt": REPORT_JOB_MAX_ATTEMPTS}
+        },
+        {
+            "$set": {
+                "status": "running",
+                "stage": "starting",
+                "lease_owner": worker_id,
+                "lease_expires_at": now + timedelta(seconds=REPORT_JOB_LEASE_SECONDS),
+                "updated_at": now
+            },
+            "$inc": {"attempts": 1}
+        },
+        sort=[("created_at", 1)],
+        return_document=ReturnDocument.AFTER
+    )
+
+
+async def _finish_job(job, worker_id, update):
+    update["updated_at"] = datetime.utcnow()
+    update["finished_at"] = update["updated_at"]
+    update["lease_owner"] = None
+    update["lease_expires_at"] = None
+    await db.report_jobs.update_one({"_id": job["_id"], "lease_owner": worker_id}, {"$set": update})
+
+
+def _user_report_filter(job):
+    return {
+        "user_id": job["user_id"],
+        "profile_id": job["profile_id"],
+        "report_id": job["report_id"]
+    }
+
+
+async def _charge_for_report(job):
+    """
+    Takes the report's credits before any LLM work, against the wallet's
+    balance guard, and marks the job as charged so a terminal failure can
+    refund. Retries find the report already paid and are not charged again.
+    """
+    # Rows created before credits moved to the job have no is_paid flag and were charged on purchase.
+    claimed = await db.user_reports.find_one_and_update(
+        {**_user_report_filter(job), "is_paid": False},
+        {"$set": {"is_paid": True}}
+    )
+    if not claimed:
+        return
+
+    try:
+        await deduct_user_credits(str(job["user_id"]), REPORT_CREDITS, "1 Report Consumed")
+    except Exception:
+        await db.user_reports.update_one(_user_report_filter(job), {"$set": {"is_paid": False}})
+        raise
+    await db.report_jobs.update_one({"_id": job["_id"]}, {"$set": {"charged": True}})
+    job["charged"] = True
+
+
+async def _refund_report(job):
+    """
+    Gives back the credits of a charged job that failed for good and drops
+    whatever it produced, so a failed report is not readable for free.
+    """
+    if not job.get("charged"):
+        return
+    refunded = await db.report_jobs.update_one({"_id": job["_id"], "charged": True}, {"$set": {"charged": False}})
+    if not refunded.modified_count:
+        return
+
+    user_report_filter = _user_report_filter(job)
+    await db.user_reports.update_one(
+        user_report_filter,
+        {"$set": {"is_paid": False, "report_text": None, "file_url": None, "storage_key": None}}
+    )
+    conversations = await db.conversations.find({**user_report_filter, "category": "report"}, {"_id": 1}).to_list(length=None)
+    conversation_ids = [conversation["_id"] for conversation in conversations]
+    if conversation_ids:
+        await db.chat_history.delete_many({"conversation_id": {"$in": conversation_ids}})
+        await db.conversations.delete_many({"_id": {"$in": conversation_ids}})
+    await add_user_credits(str(job["user_id"]), REPORT_CREDITS, "Report Generation Failed Refund")
+
+
+async def _run_job(job, worker_id):
+    async def progress(stage, percent):
+        result = await db.report_jobs.update_one(
+            {"_id": job["_id"], "lease_owner": worker_id},
+            {
+                "$set": {
+                    "stage": stage,
+                    "progress": percent,
+                    "lease_expires_at": datetime.utcnow() + timedelta(seconds=REPORT_JOB_LEASE_SECONDS),
+                    "updated_at": datetime.utcnow()
+                }
+            }
+        )
+        if result.matched_count == 0:
+            raise RuntimeError("Report job lease lost")
+
+    async def renew_lease():
+        # The LLM call can outlast the lease; progress() only renews between stages.
+        while True:
+            await asyncio.sleep(REPORT_JOB_LEASE_SECONDS / 3)
+            try:
+                result = await db.report_jobs.update_one(
+                    {"_id": job["_id"], "lease_owner": worker_id},
+                    {"$set": {
+                        "lease_expires_at": datetime.utcnow() + timedelta(seconds=REPORT_JOB_LEASE_SECONDS),
+                        "updated_at": datetime.utcnow()
+                    }}
+                )
+            except Exception as e:
+                logger.warning("Could not renew lease of report job %s: %s", job["_id"], e)
+                continue
+            if result.matched_count == 0:
+                # The next progress() call raises and stops the job.
+                logger.warning("Report job %s lease lost", job["_id"])
+                return
+
+    heartbeat = asyncio.create_task(renew_lease())
+    try:
+        await _execute_job(job, worker_id, progress)
+    finally:
+        heartbeat.cancel()
+
+
+async def _execute_job(job, worker_id, progress):
+    user_id = str(job["user_id"])
+    try:
+        await progress("charging", 2)
+        await _charge_for_report(job)
+        await progress("loading_data", 5)
+        generated_report, conversation_id = await generate_report_from_ai(
+            str(job["report_id"]),
+            user_id,
+            str(job["profile_id"]),
+            job["language"],
+            progress
+        )
+    except Exception as e:
+        detail = e.detail if isinstance(e, HTTPException) else str(e)
+        retry = not isinstance(e, HTTPException) and job["attempts"] < REPORT_JOB_MAX_ATTEMPTS
+        logger.warning("Report job %s failed (attempt %s): %s", job["_id"], job["attempts"], detail)
+        if retry:
+            await db.report_jobs.update_one(
+                {"_id": job["_id"], "lease_owner": worker_id},
+                {"$set": {"status": "queued", "stage": "retrying", "error": detail, "lease_owner": None, "lease_expires_at": None, "updated_at": datetime.utcnow()}}
+            )
+        else:
+            await _refund_report(job)
+            await _finish_job(job, worker_id, {"status": "failed", "stage": "failed", "error": detail})
+        return
+
+    await _finish_job(job, worker_id, {
+        "status": "succeeded",
+        "stage": "done",
+        "progress": 100,
+        "error": None,
+        "result": {
+            "report": generated_report,
+            "conversation_id": str(conversation_id) if conversation_id else None
+        }
+    })
+
+
+async def _worker_loop(worker_id):
+    while True:
+        try:
+            job = await _claim_next_job(worker_id)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.warning("Report worker %s could not claim a job: %s", worker_id, e)
+            job = None
+
+        if not job:
+            await asyncio.sleep(REPORT_JOB_POLL_SECONDS)
+            continue
+        try:
+            await _run_job(job, worker_id)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.warning("Report worker %s failed on job %s: %s", worker_id, job["_id"], e)
+
+
+def start_report_workers():
+    host = socket.gethostname()
+    for i in range(REPORT_WORKERS):
+        worker_id = f"{host}:{os.getpid()}:{i}:{uuid.uuid4().hex[:6]}"
+        _workers.append(asyncio.create_task(_worker_loop(worker_id)))
+
+
+async def stop_report_workers():
+    for task in _workers:
+        task.cancel()
+    await asyncio.gather(*_workers, return_exceptions=True)
+    _workers.clear()
+
+
+async def report_job_events(job_id, user_id):
+    job = await fetch_report_job(job_id, user_id)
+    last_seen = None
+    while True:
+        snapshot = (job["status"], job["stage"], job["progress"])
+        if snapshot != last_seen:
+            last_seen = snapshot
+            yield f"event: progress\ndata: {json.dumps(job, default=str)}\n\n"
+        if job["status"] in TERMINAL_STATUSES:
+            return
+        await asyncio.sleep(REPORT_JOB_POLL_SECONDS)
+        job = await fetch_report_job(job_id, user_id)
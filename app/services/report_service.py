@@ -2,8 +2,10 @@ from fastapi import HTTPException, status
 from app.db.mongo import db
 from bson import ObjectId
 from app.utils.mongo import convert_mongo
-from app.services.subscription_service import deduct_user_credits
+from app.services.subscription_service import fetch_user_coins
+from app.utils.report_artifacts import store_report_pdf, report_pdf_download
 
+REPORT_CREDITS = 10
 
 
 async def add_report_in_db(payload):
@@ -13,7 +15,8 @@ async def add_report_in_db(payload):
             "type": payload.type,
             "sub_title": payload.sub_title,
             "description": payload.description,
-            "prompt": payload.prompt
+            "prompt": payload.prompt,
+            "sections": [section.dict() for section in payload.sections] if payload.sections else None
         })
     except HTTPException as http_err:
         raise http_err
@@ -132,15 +135,19 @@ async def add_user_report_to_db(id, user_id, profile_id):
 
         if existing_report:
             raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="You have already purchased this report")
+
+        # Credits are charged by the report job once generation succeeds.
+        if await fetch_user_coins(user_id) < REPORT_CREDITS:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Insufficient credits")
         
         await db.user_reports.insert_one({
             "user_id": ObjectId(user_id),
             "profile_id": ObjectId(profile_id),
             "report_id": ObjectId(id),
             "file_url": None,
-            "report_text": None
+            "report_text": None,
+            "is_paid": False
         })
-        await deduct_user_credits(user_id, 10, "1 Report Consumed")
     except HTTPException as http_err:
         raise http_err
     except Exception as e:
@@ -292,3 +299,39 @@ async def fetch_user_reports(user_id, profile_id=None):
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"Error while fetching user reports: {str(e)}"
         )
+
+
+async def fetch_user_report_pdf(id, user_id, profile_id):
+    """
+    Renders the PDF of a generated report on first download and reuses the
+    stored artifact afterwards. Returns a short-lived download link.
+    """
+    try:
+        user_report = await db.user_reports.find_one({
+            "user_id": ObjectId(user_id),
+            "profile_id": ObjectId(profile_id),
+            "report_id": ObjectId(id)
+        })
+        if not user_report:
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Report Not Found")
+        if not user_report.get("report_text"):
+            raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail="Report Has Not Been Generated Yet")
+
+        storage_key = user_report.get("storage_key")
+        if not storage_key:
+            report = await db.reports.find_one({"_id": user_report["report_id"]}, {"name": 1})
+            title = (report or {}).get("name", "Astrology Report")
+            storage_key, file_url = await store_report_pdf("astrology_reports", user_report["report_text"], title)
+            await db.user_reports.update_one(
+                {"_id": user_report["_id"], "report_text": user_report["report_text"]},
+                {"$set": {"file_url": file_url, "storage_key": storage_key}}
+            )
+
+        return await report_pdf_download(storage_key)
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Error while fetching report pdf: {str(e)}"
+        )
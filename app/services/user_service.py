@@ -9,8 +9,6 @@ from app.services.astrology_service import fetch_user_profile_summary
 from app.services.subscription_service import fetch_user_coins
 from app.utils.helper import convert_to_local_timezone
 from app.utils.mongo import convert_mongo
-from app.clients.gemini_client import client
-from google.genai import types
 import asyncio
 import re
 import pytz
@@ -145,16 +143,19 @@ async def fetch_dashboard_details_for_user(id, profile_id: str | None = None, se
         conversations_task = fetch_conversations(id, profile_id, search_term)
         user_reports_task = fetch_user_reports_for_admin(id, profile_id)
         user_compatibility_reports_task = fetch_user_compatibility_reports_for_admin(id, profile_id)
+        profile_summary_task = fetch_user_profile_summary(id, profile_id, profile_details)
 
-        astrology_data, conversations_raw, user_reports_raw, user_compatibility_reports_raw = await asyncio.gather(
+        astrology_data, conversations_raw, user_reports_raw, user_compatibility_reports_raw, profile_summary = await asyncio.gather(
             astrology_data_task,
             conversations_task,
             user_reports_task,
             user_compatibility_reports_task,
+            profile_summary_task,
             return_exceptions=True
 
         )
-        profile_summary = await fetch_user_profile_summary(profile_details, conversations_raw, user_reports_raw)
+        if isinstance(profile_summary, Exception):
+            profile_summary = None
         indu_lagna = astrology_data.get("indu_lagna")
         karakamsha_lagna = astrology_data.get("karakamsha_lagna")
         arudha_lagna = astrology_data.get("arudha_lagna")
@@ -251,6 +252,8 @@ async def delete_user_by_id(id):
         await db.users.delete_one({"_id": ObjectId(id)})
         await db.conversations.delete_many({"user_id": ObjectId(id)})
         await db.chat_history.delete_many({"user_id": ObjectId(id)})
+        await db.conversation_memory.delete_many({"user_id": ObjectId(id)})
+        await db.profile_summaries.delete_many({"user_id": ObjectId(id)})
         await db.astrological_information.delete_many({"user_id": ObjectId(id)})
         await db.user_profiles.delete_many({"user_id": ObjectId(id)})
         await db.user_reports.delete_many({"user_id": ObjectId(id)})
@@ -0,0 +1,136 @@
+from app.db.mongo import db
+from app.utils.llm import generate_content
+from bson import ObjectId
+from pymongo.errors import DuplicateKeyError
+from datetime import datetime
+import asyncio
+import logging
+import os
+
+logger = logging.getLogger(__name__)
+
+# Messages (not turns) kept verbatim in every prompt.
+MEMORY_RECENT_MESSAGES = int(os.getenv("MEMORY_RECENT_MESSAGES", "8"))
+# How many unsummarised messages beyond the recent window trigger a summary refresh.
+MEMORY_SUMMARY_EVERY = int(os.getenv("MEMORY_SUMMARY_EVERY", "6"))
+# Upper bound per refresh so old, long conversations catch up over a few turns.
+MEMORY_SUMMARY_BATCH = 40
+
+SUMMARY_PROMPT = """
+You maintain the running memory of an astrology chat between a user and an AI astrologer.
+Update the existing summary with the new messages.
+Keep facts the user shared about themselves, the questions they asked, the predictions and
+chart references given, and any open follow-up questions.
+Write in third person, as compact bullet points, in the same language as the conversation.
+Return only the updated summary.
+"""
+
+_refreshing = set()
+_background_tasks = set()
+
+
+def _format_messages(messages):
+    return "\n".join(f"{msg['role']}: {msg['message']}" for msg in messages)
+
+
+async def get_conversation_context(conversation_id, profile_id):
+    """
+    Returns the prompt history for a conversation (summary of older turns
+    plus the latest messages verbatim) and how many messages are not yet
+    folded into the summary.
+    """
+    memory = await db.conversation_memory.find_one({"conversation_id": ObjectId(conversation_id)}) or {}
+
+    query = {
+        "conversation_id": ObjectId(conversation_id),
+        "profile_id": ObjectId(profile_id)
+    }
+    if memory.get("summarized_until"):
+        query["created_at"] = {"$gt": memory["summarized_until"]}
+
+    recent = await db.chat_history.find(
+        query,
+        {"role": 1, "message": 1}
+    ).sort("created_at", -1).limit(MEMORY_RECENT_MESSAGES + MEMORY_SUMMARY_EVERY).to_list(length=None)
+    recent.reverse()
+
+    history_text = _format_messages(recent)
+    if memory.get("summary"):
+        history_text = f"Summary of earlier conversation:\n{memory['summary']}\n\nRecent messages:\n{history_text}"
+
+    return history_text, len(recent)
+
+
+async def refresh_conversation_summary(conversation_id, profile_id, user_id=None):
+    memory = await db.conversation_memory.find_one({"conversation_id": ObjectId(conversation_id)}) or {}
+
+    query = {
+        "conversation_id": ObjectId(conversation_id),
+        "profile_id": ObjectId(profile_id)
+    }
+    if memory.get("summarized_until"):
+        query["created_at"] = {"$gt": memory["summarized_until"]}
+
+    messages = await db.chat_history.find(
+        query,
+        {"role": 1, "message": 1, "created_at": 1}
+    ).sort("created_at", 1).to_list(length=None)
+
+    to_fold = messages[:-MEMORY_RECENT_MESSAGES][:MEMORY_SUMMARY_BATCH]
+    if not to_fold:
+        return
+
+    contents = [
+        f"Existing summary:\n{memory.get('summary') or '(none)'}\n\n",
+        f"New messages:\n{_format_messages(to_fold)}"
+    ]
+    response = await generate_content(
+        "conversation_summary",
+        contents,
+        system_instruction=SUMMARY_PROMPT,
+        user_id=user_id,
+    )
+
+    # Only applies on top of the summary this fold started from. If another worker moved the
+    # watermark meanwhile the filter misses, and the upsert then hits the unique
+    # conversation_id index, so this fold is dropped instead of rewinding or double-counting.
+    try:
+        await db.conversation_memory.update_one(
+            {"conversation_id": ObjectId(conversation_id), "summarized_until": memory.get("summarized_until")},
+            {
+                "$set": {
+                    "summary": response.text.strip(),
+                    "summarized_until": to_fold[-1]["created_at"],
+                    "updated_at": datetime.utcnow()
+                },
+                "$inc": {"summarized_messages": len(to_fold)},
+                "$setOnInsert": {
+                    "user_id": ObjectId(user_id) if user_id else None,
+                    "created_at": datetime.utcnow()
+                }
+            },
+            upsert=True
+        )
+    except DuplicateKeyError:
+        logger.info("Summary of conversation %s was refreshed concurrently, dropping this fold", conversation_id)
+
+
+async def _refresh_in_background(conversation_id, profile_id, user_id):
+    try:
+        await refresh_conversation_summary(conversation_id, profile_id, user_id)
+    except Exception as e:
+        logger.warning("Could not refresh summary for conversation %s: %s", conversation_id, e)
+    finally:
+        _refreshing.discard(str(conversation_id))
+
+
+def schedule_summary_refresh(conversation_id, profile_id, unsummarized_count, user_id=None):
+    if unsummarized_count < MEMORY_RECENT_MESSAGES + MEMORY_SUMMARY_EVERY:
+        return
+    if str(conversation_id) in _refreshing:
+        return
+
+    _refreshing.add(str(conversation_id))
+    task = asyncio.create_task(_refresh_in_background(conversation_id, profile_id, user_id))
+    _background_tasks.add(task)
+    task.add_done_callback(_background_tasks.discard)
@@ -1,27 +1,22 @@
 from fastapi import HTTPException, status
 from app.db.mongo import db
-from app.clients.openai_client import openai_client
-from app.clients.gemini_client import client
-from google.genai import types
 import os
 import httpx
 from base64 import b64encode
 from datetime import datetime, timezone, timedelta
-from fpdf import FPDF
 from bson import ObjectId
 import json
 from app.services.prompt_service import fetch_categories
 import asyncio
-import io
 import re
-from app.clients.aws import s3_client, S3_BUCKET
-from app.core.concurrency import llm_semaphore
-from app.utils.concurrency import generate_with_retry
+from app.utils.llm import generate_content
+from app.utils.conversation_memory import get_conversation_context, schedule_summary_refresh
 from app.services.subscription_service import deduct_user_credits
 import pytz
 
 ASTRO_API_USER_ID = os.getenv("ASTROLOGY_API_USER_ID")
 ASTRO_API_KEY = os.getenv("ASTROLOGY_API_KEY")
+REPORT_SECTION_CONCURRENCY = int(os.getenv("REPORT_SECTION_CONCURRENCY", "2"))
 
 BASE_URL = "https://json.astrologyapi.com/v1"
 
@@ -293,7 +288,7 @@ async def fetch_profile_details(user_id, profile_id):
     return profile
 
 
-async def get_category_from_question(question):
+async def get_category_from_question(question, user_id=None):
     category_list = await fetch_categories()
     system_prompt = f"""
     You are a strict classifier. Your job is to choose ONE category for the question.
@@ -311,18 +306,12 @@ async def get_category_from_question(question):
     A: career
     """
     
-    config = types.GenerateContentConfig(
-        temperature=1.0,
+    response = await generate_content(
+        "question_category",
+        question,
         system_instruction=system_prompt,
+        user_id=user_id,
     )
-    async with llm_semaphore:
-        response = await generate_with_retry(
-            lambda: client.aio.models.generate_content(
-                model="gemini-3-flash-preview",
-                contents=question,
-                config=config,
-            )
-        )
 
     reply = response.text.strip().strip('"').strip("'").lower()  # <-- normalize
     return reply
@@ -358,7 +347,7 @@ async def create_conversation(user_id, profile_id, category, first_user_message)
 
 
 async def get_astrology_prediction(user_astrology_data: dict, user_question: str, user_id: str, profile_id: str, conversation_id=None, language=None):
-    category = await get_category_from_question(user_question)
+    category = await get_category_from_question(user_question, user_id)
     dob = user_astrology_data.get("date_of_birth")
     astrology_summary = "\n".join(f"{key}: {value}" for key, value in user_astrology_data.items())
     if not conversation_id:
@@ -411,14 +400,7 @@ async def get_astrology_prediction(user_astrology_data: dict, user_question: str
         - Always ask a follow-up astrology-related question at the end of your response.
     """
     
-    past_messages = await db.chat_history.find({
-        "conversation_id": ObjectId(conversation_id),
-        "profile_id": ObjectId(profile_id)
-    }).to_list(length=20)  
-    
-    history_text = "\n".join(
-        [f"{msg['role']}: {msg['message']}" for msg in past_messages]
-    )
+    history_text, unsummarized_count = await get_conversation_context(conversation_id, profile_id)
     
     contents = [
         f"Chat History: \n{history_text}\n\n"
@@ -427,20 +409,13 @@ async def get_astrology_prediction(user_astrology_data: dict, user_question: str
     ]
 
 
-    config = types.GenerateContentConfig(
-        temperature = 1.0,
-        system_instruction = system_prompt
+    response = await generate_content(
+        "chat",
+        contents,
+        system_instruction=system_prompt,
+        user_id=user_id,
     )
 
-    async with llm_semaphore:
-        response = await generate_with_retry(
-            lambda: client.aio.models.generate_content(
-                model="gemini-3-flash-preview",
-                contents=contents,
-                config=config,
-            )
-        )
-
     reply = response.text
 
     now = datetime.utcnow()
@@ -450,7 +425,7 @@ async def get_astrology_prediction(user_astrology_data: dict, user_question: str
     await save_chat_in_db(user_id, profile_id, "user", conversation_id, user_question, category, user_created_at)
     message_id = await save_chat_in_db(user_id, profile_id, "assistant", conversation_id, reply, category, assistant_created_at)
     await deduct_user_credits(user_id, 1, "1 Chat Consumed")
-    
+    schedule_summary_refresh(conversation_id, profile_id, unsummarized_count + 2, user_id)
 
     return reply, category, conversation_id, message_id
 
@@ -469,7 +444,7 @@ def markdown_to_plain(text: str) -> str:
 
 
 
-async def save_user_report(user_id, profile_id, report_id, file_url, report_text):
+async def save_user_report(user_id, profile_id, report_id, file_url, report_text, storage_key=None):
     result = await db.user_reports.update_one(
         {   "user_id": ObjectId(user_id),
             "profile_id": ObjectId(profile_id),
@@ -478,14 +453,52 @@ async def save_user_report(user_id, profile_id, report_id, file_url, report_text
         {
             "$set": {
                 "file_url": file_url,
-                "report_text": report_text
+                "report_text": report_text,
+                "storage_key": storage_key
             }
         }
     )
 
     return result
 
-async def generate_report_helper(user_details, astrology_data, user_report, pdf_report, user_id, profile_id, language):
+async def generate_report_sections(sections, contents, prompt, user_id, progress=None):
+    titles = [section["title"] for section in sections]
+    completed = 0
+    # Per-report cap so one report cannot hold every slot of the shared LLM semaphore.
+    section_slots = asyncio.Semaphore(REPORT_SECTION_CONCURRENCY)
+
+    async def generate_section(index, section):
+        nonlocal completed
+        others = ", ".join(t for i, t in enumerate(titles) if i != index)
+        section_contents = contents + [
+            f"Write ONLY the section \"{section['title']}\" of this report, starting with the heading '## {section['title']}'.\n"
+            f"{section.get('prompt') or ''}\n"
+            f"The other sections ({others}) are written separately, do not cover them and do not add an introduction or closing for the whole report."
+        ]
+        async with section_slots:
+            response = await generate_content(
+                "report_section",
+                section_contents,
+                system_instruction=prompt,
+                user_id=user_id,
+            )
+        completed += 1
+        if progress:
+            await progress("generating", 15 + int(50 * completed / len(sections)))
+        return response.text.strip()
+
+    # Sections run concurrently and are stitched back in declared order; the first failure cancels the rest.
+    tasks = [asyncio.create_task(generate_section(i, section)) for i, section in enumerate(sections)]
+    try:
+        parts = await asyncio.gather(*tasks)
+    finally:
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+    return "\n\n".join(parts)
+
+
+async def generate_report_helper(user_details, astrology_data, user_report, user_id, profile_id, language, progress=None):
     astrology_summary = "\n".join(f"{key}: {value}" for key, value in astrology_data.items())
     prompt = user_report.get("prompt", "You are an astrology report generator.")
     report_name = user_report.get("name", "Astrology Report")
@@ -495,28 +508,27 @@ async def generate_report_helper(user_details, astrology_data, user_report, pdf_
         f"Generate a detailed, warm, human-sounding astrology report in {language} language"
     ]
 
-    config = types.GenerateContentConfig(
-        temperature=1.0,
-        max_output_tokens=5000,
-        system_instruction=prompt,
-    )
-
-    async with llm_semaphore:
-        response = await generate_with_retry(
-            lambda: client.aio.models.generate_content(
-                model="gemini-3-flash-preview",
-                contents=contents,
-                config=config,
-            )
+    if progress:
+        await progress("generating", 15)
+    sections = user_report.get("sections")
+    if sections:
+        report_text = await generate_report_sections(sections, contents, prompt, user_id, progress)
+    else:
+        response = await generate_content(
+            "report",
+            contents,
+            system_instruction=prompt,
+            user_id=user_id,
         )
-    
-    report_text = response.text
+        report_text = response.text
 
+    if progress:
+        await progress("saving", 70)
     await save_user_report(
         user_id,
         profile_id,
         user_report["_id"],
-        None,          # file_url (updated later if PDF exists)
+        None,          # file_url (set when the PDF is first downloaded)
         report_text
     )
 
@@ -540,117 +552,7 @@ async def generate_report_helper(user_details, astrology_data, user_report, pdf_
         "is_disliked": False,
         "created_at": datetime.utcnow()
     })
-    if not pdf_report or pdf_report is False:
-        return report_text, conversation_id
-
-    safe_text = markdown_to_plain(report_text)
-
-    pdf = FPDF()
-    pdf.set_auto_page_break(auto=True, margin=15)
-    pdf.set_left_margin(15)
-    pdf.set_right_margin(15)
-    pdf.add_page()
-
-    pdf.add_font(
-        "NotoSans",
-        "",
-        "app/deps/fonts/NotoSans-Regular.ttf",
-        uni=True,
-    )
-    pdf.add_font(
-        "NotoSans",
-        "I",
-        "app/deps/fonts/NotoSans-Italic.ttf",
-        uni=True,
-    )
-    pdf.add_font(
-        "NotoSans",
-        "B",
-        "app/deps/fonts/NotoSans-Bold.ttf",
-        uni=True,
-    )
-
-    # Title
-    pdf.set_font("NotoSans", "B", 16)
-    pdf.cell(0, 10, report_name, ln=True, align="C")
-    pdf.ln(10)
-
-    pdf.set_font("NotoSans", "", 12)
-
-    paragraphs = safe_text.split("\n")
-    lines = report_text.split("\n")
-
-    for line in lines:
-        line = line.strip()
-
-        if not line:
-            pdf.ln(5)
-            continue
-
-        # H1 / H2 style (## Heading)
-        if line.startswith("## "):
-            pdf.set_font("NotoSans", "B", 15)
-            pdf.multi_cell(0, 10, line.replace("## ", ""))
-            pdf.ln(4)
-            pdf.set_font("NotoSans", "", 12)
-            continue
-
-        # H3 style (### Heading)
-        if line.startswith("### "):
-            pdf.set_font("NotoSans", "B", 13)
-            pdf.multi_cell(0, 8, line.replace("### ", ""))
-            pdf.ln(3)
-            pdf.set_font("NotoSans", "", 12)
-            continue
-
-        # Bold inline text (**text**)
-        bold_parts = re.split(r'(\*\*.*?\*\*)', line)
-
-        for part in bold_parts:
-            if part.startswith("**") and part.endswith("**"):
-                pdf.set_font("NotoSans", "B", 12)
-                pdf.write(8, part.replace("**", ""))
-                pdf.set_font("NotoSans", "", 12)
-            else:
-                pdf.write(8, part)
-
-        pdf.ln(8)
-
-    pdf.ln(5)
-
-    if pdf.get_y() > 260:
-        pdf.add_page()
-
-    pdf.set_font("NotoSans", "I", 10)
-    pdf.cell(
-        0,
-        10,
-        f"Generated on {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}",
-        align="R",
-    )
-
-    pdf_raw = pdf.output(dest="S")
-    if isinstance(pdf_raw, str):
-        pdf_bytes = pdf_raw.encode("latin1")
-    else:
-        pdf_bytes = bytes(pdf_raw)
-
-    pdf_buffer = io.BytesIO(pdf_bytes)
-    pdf_buffer.seek(0)
-
-    filename = f"astrology_report_{datetime.now().strftime('%Y%m%d%H%M%S')}.pdf"
-    s3_key = f"astrology_reports/{filename}"
-
-    s3_client.upload_fileobj(
-        Fileobj=pdf_buffer,
-        Bucket=S3_BUCKET,
-        Key=s3_key,
-        ExtraArgs={"ContentType": "application/pdf"},
-    )
-
-    file_url = f"https://{S3_BUCKET}.s3.amazonaws.com/{s3_key}"
-    await save_user_report(user_id, profile_id, user_report["_id"], file_url, report_text)
-    return file_url, None
+    return report_text, conversation_id
 
 
 async def fetch_user_report(id, user_id, profile_id):
@@ -682,7 +584,7 @@ async def fetch_user_report(id, user_id, profile_id):
     
 
 
-async def generate_predictions_for_homepage(user_details, astrology_data, language):
+async def generate_predictions_for_homepage(user_details, astrology_data, language, user_id=None):
     try:
         astrology_summary = "\n".join(f"{key}: {value}" for key, value in astrology_data.items())
         prediction_prompt_doc = await db.predictions.find().sort("created_at", -1).to_list(1)
@@ -710,20 +612,13 @@ async def generate_predictions_for_homepage(user_details, astrology_data, langua
         ]
 
 
-        config = types.GenerateContentConfig(
-            temperature=1.0,
+        response = await generate_content(
+            "dashboard_prediction",
+            contents,
             system_instruction=prompt,
+            user_id=user_id,
         )
 
-        async with llm_semaphore:
-            response = await generate_with_retry(
-                lambda: client.aio.models.generate_content(
-                    model="gemini-3-flash-preview",
-                    contents=contents,
-                    config=config,
-                )
-            )
-
 
         content = response.text
         content_cleaned = re.sub(r"^```json\s*|```$", "", content.strip(), flags=re.MULTILINE)
@@ -0,0 +1,349 @@
+from app.clients.gemini_client import client
+from app.clients.openai_client import async_openai_client
+from app.core.concurrency import llm_semaphore
+from app.db.mongo import db
+from app.utils.concurrency import generate_with_retry, is_gemini_429_error
+from app.utils.llm_metrics import record_llm_call
+from google.genai import types
+from collections import deque
+from dataclasses import dataclass
+from typing import Optional
+import asyncio
+import logging
+import os
+import time
+
+logger = logging.getLogger(__name__)
+
+GEMINI_MODEL = os.getenv("GEMINI_MODEL", "gemini-3-flash-preview")
+FALLBACK_MODEL = os.getenv("LLM_FALLBACK_MODEL", "gpt-4o-mini")
+
+FAILOVER_THRESHOLD = int(os.getenv("LLM_FAILOVER_THRESHOLD", "5"))
+FAILOVER_WINDOW_SECONDS = int(os.getenv("LLM_FAILOVER_WINDOW_SECONDS", "60"))
+FAILOVER_COOLDOWN_SECONDS = int(os.getenv("LLM_FAILOVER_COOLDOWN_SECONDS", "30"))
+HEDGE_DEFAULT_DELAY_SECONDS = float(os.getenv("LLM_HEDGE_DEFAULT_DELAY_SECONDS", "8"))
+HEDGE_MIN_DELAY_SECONDS = float(os.getenv("LLM_HEDGE_MIN_DELAY_SECONDS", "1"))
+HEDGE_MIN_SAMPLES = 20
+
+_FALLBACK = {"provider": "openai", "model": FALLBACK_MODEL} if os.getenv("OPENAI_API_KEY") else None
+
+MODEL_TIERS = {
+    "fast": {"provider": "gemini", "model": os.getenv("GEMINI_FAST_MODEL", "gemini-2.5-flash-lite")},
+    "standard": {"provider": "gemini", "model": GEMINI_MODEL},
+}
+
+ROUTE_FIELDS = ("tier", "max_output_tokens", "temperature", "timeout", "hedge", "thinking_budget")
+LLM_ROUTES_TTL_SECONDS = int(os.getenv("LLM_ROUTES_TTL_SECONDS", "60"))
+
+# Per-task routing defaults. Documents in the llm_routes collection
+# ({"task": ..., <field>: ...}) override these and are re-read every
+# LLM_ROUTES_TTL_SECONDS, so tiers and budgets can change without a deploy.
+# max_output_tokens is the visible answer; thinking models spend their
+# thinking_budget on top of it (None leaves the model's default thinking).
+DEFAULT_LLM_ROUTES = {
+    "default": {"tier": "standard", "max_output_tokens": None, "temperature": 1.0, "timeout": 60, "hedge": False, "thinking_budget": 1024},
+    "question_category": {"tier": "fast", "max_output_tokens": 32, "temperature": 0.0, "timeout": 10, "hedge": True, "thinking_budget": None},
+    "question_categories": {"tier": "fast", "max_output_tokens": 256, "temperature": 0.0, "timeout": 15, "hedge": True, "thinking_budget": None},
+    "follow_up_questions": {"tier": "fast", "max_output_tokens": 512, "temperature": 0.9, "timeout": 20, "hedge": True, "thinking_budget": None},
+    "chat": {"tier": "standard", "max_output_tokens": 4096, "temperature": 1.0, "timeout": 60, "hedge": True, "thinking_budget": 1024},
+    "report_chat": {"tier": "standard", "max_output_tokens": 2048, "temperature": 1.0, "timeout": 45, "hedge": True, "thinking_budget": 1024},
+    "dashboard_prediction": {"tier": "standard", "max_output_tokens": 2048, "temperature": 1.0, "timeout": 45, "hedge": True, "thinking_budget": 1024},
+    "report": {"tier": "standard", "max_output_tokens": 5000, "temperature": 1.0, "timeout": 180, "hedge": False, "thinking_budget": 2048},
+    "report_section": {"tier": "standard", "max_output_tokens": 1500, "temperature": 1.0, "timeout": 90, "hedge": False, "thinking_budget": 1024},
+    "compatibility_report": {"tier": "standard", "max_output_tokens": 6000, "temperature": 1.0, "timeout": 180, "hedge": False, "thinking_budget": 2048},
+    "profile_summary": {"tier": "fast", "max_output_tokens": 1024, "temperature": 0.3, "timeout": 60, "hedge": False, "thinking_budget": None},
+    "conversation_summary": {"tier": "fast", "max_output_tokens": 600, "temperature": 0.2, "timeout": 30, "hedge": False, "thinking_budget": None},
+}
+
+_routes_cache = {"routes": None, "loaded_at": 0.0}
+_routes_lock = asyncio.Lock()
+
+
+async def load_llm_routes(force: bool = False):
+    if not force and _routes_cache["routes"] is not None and time.monotonic() - _routes_cache["loaded_at"] < LLM_ROUTES_TTL_SECONDS:
+        return _routes_cache["routes"]
+
+    async with _routes_lock:
+        if not force and _routes_cache["routes"] is not None and time.monotonic() - _routes_cache["loaded_at"] < LLM_ROUTES_TTL_SECONDS:
+            return _routes_cache["routes"]
+
+        routes = {task: dict(route) for task, route in DEFAULT_LLM_ROUTES.items()}
+        try:
+            async for doc in db.llm_routes.find({}, {"_id": 0}):
+                task = doc.get("task")
+                if not task:
+                    continue
+                overrides = {k: v for k, v in doc.items() if k in ROUTE_FIELDS}
+                routes[task] = {**routes.get(task, routes["default"]), **overrides}
+        except Exception as e:
+            logger.warning("Could not load LLM routes from db, keeping previous table: %s", e)
+            if _routes_cache["routes"] is not None:
+                routes = _routes_cache["routes"]
+
+        _routes_cache["routes"] = routes
+        _routes_cache["loaded_at"] = time.monotonic()
+        return routes
+
+
+async def get_llm_route(task: str):
+    routes = await load_llm_routes()
+    return routes.get(task, routes["default"])
+
+
+@dataclass
+class LLMResponse:
+    text: str
+    provider: str
+    model: str
+    input_tokens: Optional[int] = None
+    output_tokens: Optional[int] = None
+    truncated: bool = False
+
+
+class LLMIncompleteResponseError(Exception):
+    """Empty output or output cut off at the token cap; retried like a 5xx."""
+    status_code = 502
+
+
+class _CircuitBreaker:
+    def __init__(self):
+        self.failures = deque()
+        self.open_until = 0.0
+
+    def is_open(self):
+        return time.monotonic() < self.open_until
+
+    def record_success(self):
+        self.failures.clear()
+
+    def record_failure(self):
+        now = time.monotonic()
+        self.failures.append(now)
+        while self.failures and now - self.failures[0] > FAILOVER_WINDOW_SECONDS:
+            self.failures.popleft()
+        if len(self.failures) >= FAILOVER_THRESHOLD:
+            self.open_until = now + FAILOVER_COOLDOWN_SECONDS
+            self.failures.clear()
+            logger.warning("LLM provider failing, routing to fallback for %ss", FAILOVER_COOLDOWN_SECONDS)
+
+
+_breakers = {}
+_latencies = {}
+
+
+def _breaker(provider):
+    if provider not in _breakers:
+        _breakers[provider] = _CircuitBreaker()
+    return _breakers[provider]
+
+
+def _record_latency(task, target, seconds):
+    # Per task: a 5000-token report and a short chat reply on one model have nothing in common.
+    key = (task, target["provider"], target["model"])
+    if key not in _latencies:
+        _latencies[key] = deque(maxlen=200)
+    _latencies[key].append(seconds)
+
+
+def _hedge_delay(task, target):
+    samples = _latencies.get((task, target["provider"], target["model"]))
+    if not samples or len(samples) < HEDGE_MIN_SAMPLES:
+        return HEDGE_DEFAULT_DELAY_SECONDS
+    ordered = sorted(samples)
+    return max(HEDGE_MIN_DELAY_SECONDS, ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))])
+
+
+def is_retryable_llm_error(exception: Exception) -> bool:
+    if isinstance(exception, asyncio.TimeoutError):
+        return True
+    code = getattr(exception, "code", None) or getattr(exception, "status_code", None)
+    if isinstance(code, int) and (code == 429 or code >= 500):
+        return True
+    return is_gemini_429_error(exception)
+
+
+def _to_openai_messages(contents, system_instruction):
+    messages = []
+    if system_instruction:
+        messages.append({"role": "system", "content": system_instruction})
+    if isinstance(contents, str):
+        contents = [contents]
+    messages.append({"role": "user", "content": "\n\n".join(str(c) for c in contents)})
+    return messages
+
+
+async def _call_gemini(model, contents, system_instruction, temperature, max_output_tokens, thinking_budget=None):
+    thinking_config = None
+    if thinking_budget is not None:
+        # Thinking tokens count against max_output_tokens, so the answer keeps its own budget.
+        thinking_config = types.ThinkingConfig(thinking_budget=thinking_budget)
+        if max_output_tokens:
+            max_output_tokens += thinking_budget
+    config = types.GenerateContentConfig(
+        temperature=temperature,
+        max_output_tokens=max_output_tokens,
+        system_instruction=system_instruction,
+        thinking_config=thinking_config,
+    )
+    response = await client.aio.models.generate_content(
+        model=model,
+        contents=contents,
+        config=config,
+    )
+    usage = response.usage_metadata
+    candidates = response.candidates or []
+    return LLMResponse(
+        text=response.text,
+        provider="gemini",
+        model=model,
+        input_tokens=getattr(usage, "prompt_token_count", None),
+        output_tokens=getattr(usage, "candidates_token_count", None),
+        truncated=bool(candidates) and candidates[0].finish_reason == types.FinishReason.MAX_TOKENS,
+    )
+
+
+async def _call_openai(model, contents, system_instruction, temperature, max_output_tokens, thinking_budget=None):
+    response = await async_openai_client.chat.completions.create(
+        model=model,
+        messages=_to_openai_messages(contents, system_instruction),
+        temperature=temperature,
+        max_tokens=max_output_tokens,
+    )
+    usage = response.usage
+    return LLMResponse(
+        text=response.choices[0].message.content,
+        truncated=response.choices[0].finish_reason == "length",
+        provider="openai",
+        model=model,
+        input_tokens=getattr(usage, "prompt_tokens", None),
+        output_tokens=getattr(usage, "completion_tokens", None),
+    )
+
+
+_PROVIDERS = {
+    "gemini": _call_gemini,
+    "openai": _call_openai,
+}
+
+
+async def _call(target, request):
+    stats = request["stats"]
+    started = time.monotonic()
+    kwargs = {k: v for k, v in request.items() if k not in ("task", "timeout", "stats")}
+    try:
+        response = await asyncio.wait_for(
+            _PROVIDERS[target["provider"]](target["model"], **kwargs),
+            timeout=request.get("timeout"),
+        )
+    except asyncio.CancelledError:
+        # An attempt cancelled by a hedge was at least this slow; dropping it would pull the p95 down.
+        _record_latency(request["task"], target, time.monotonic() - started)
+        raise
+    except Exception as e:
+        # Fast 429s and 5xx say nothing about how long a good answer takes, so failures are not sampled.
+        if is_retryable_llm_error(e):
+            _breaker(target["provider"]).record_failure()
+        raise
+    if not response.text or response.truncated:
+        raise LLMIncompleteResponseError(
+            f"{target['provider']}/{target['model']} returned {'truncated' if response.text else 'empty'} output for {request['task']}"
+        )
+    elapsed = time.monotonic() - started
+    _breaker(target["provider"]).record_success()
+    _record_latency(request["task"], target, elapsed)
+    stats["upstream_seconds"] = elapsed
+    return response
+
+
+def _current_target(primary, fallback):
+    if fallback and _breaker(primary["provider"]).is_open():
+        return fallback
+    return primary
+
+
+async def _call_with_failover(primary, fallback, request):
+    # Each attempt, retries included, asks the breaker: only sustained errors
+    # on the primary open it and move traffic to the fallback.
+    stats = request["stats"]
+    attempted = False
+
+    async def attempt():
+        nonlocal attempted
+        if attempted:
+            stats["retries"] += 1
+        attempted = True
+        target = _current_target(primary, fallback)
+        if target is not primary:
+            stats["failovers"] += 1
+        return await _call(target, request)
+
+    return await generate_with_retry(attempt)
+
+
+async def _hedged_call(primary, fallback, request):
+    tasks = {asyncio.create_task(_call_with_failover(primary, fallback, request))}
+    done, _ = await asyncio.wait(tasks, timeout=_hedge_delay(request["task"], primary))
+    if not done:
+        request["stats"]["hedges"] += 1
+        tasks.add(asyncio.create_task(_call(fallback or primary, request)))
+
+    last_error = None
+    pending = tasks
+    try:
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                if task.exception() is None:
+                    return task.result()
+                last_error = task.exception()
+        raise last_error
+    finally:
+        for task in pending:
+            task.cancel()
+
+
+async def generate_content(task: str, contents, system_instruction: str = None, temperature: float = None, max_output_tokens: int = None, user_id: str = None) -> LLMResponse:
+    route = await get_llm_route(task)
+    primary = MODEL_TIERS.get(route["tier"], MODEL_TIERS["standard"])
+    fallback = _FALLBACK
+    stats = {"retries": 0, "hedges": 0, "failovers": 0, "upstream_seconds": None}
+    request = {
+        "task": task,
+        "contents": contents,
+        "system_instruction": system_instruction,
+        "temperature": route["temperature"] if temperature is None else temperature,
+        "max_output_tokens": route["max_output_tokens"] if max_output_tokens is None else max_output_tokens,
+        "thinking_budget": route.get("thinking_budget"),
+        "timeout": route["timeout"],
+        "stats": stats,
+    }
+
+    started = time.monotonic()
+    queue_wait = None
+    response = None
+    error = None
+    try:
+        async with llm_semaphore:
+            queue_wait = time.monotonic() - started
+            if route.get("hedge"):
+                response = await _hedged_call(primary, fallback, request)
+            else:
+                response = await _call_with_failover(primary, fallback, request)
+    except Exception as e:
+        error = e
+        raise
+    finally:
+        total = time.monotonic() - started
+        record_llm_call(
+            task,
+            user_id,
+            total_seconds=total,
+            queue_wait_seconds=total if queue_wait is None else queue_wait,
+            retries=stats["retries"],
+            hedges=stats["hedges"],
+            failovers=stats["failovers"],
+            upstream_seconds=stats["upstream_seconds"],
+            response=response,
+            error=error,
+        )
+    return response
@@ -0,0 +1,130 @@
+from app.db.mongo import db
+from bson import ObjectId
+from collections import deque
+from datetime import datetime
+import asyncio
+import logging
+
+logger = logging.getLogger(__name__)
+
+# USD per 1M tokens (input, output). Unknown models are costed at 0.
+MODEL_PRICING = {
+    "gemini-3-flash-preview": (0.50, 3.00),
+    "gemini-2.5-flash-lite": (0.10, 0.40),
+    "gpt-4o-mini": (0.15, 0.60),
+}
+
+_task_metrics = {}
+# Strong references to in-flight llm_calls writes so they are not collected mid-insert.
+_pending_writes = set()
+
+
+def _new_task_metrics():
+    return {
+        "calls": 0,
+        "errors": 0,
+        "retries": 0,
+        "hedges": 0,
+        "failovers": 0,
+        "input_tokens": 0,
+        "output_tokens": 0,
+        "cost_usd": 0.0,
+        "latencies": deque(maxlen=500),
+        "queue_waits": deque(maxlen=500),
+        "upstream_latencies": deque(maxlen=500),
+    }
+
+
+def _percentile(values, pct):
+    if not values:
+        return None
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct))]
+
+
+def _ms(seconds):
+    return round(seconds * 1000) if seconds is not None else None
+
+
+def estimate_llm_cost(model, input_tokens, output_tokens):
+    input_price, output_price = MODEL_PRICING.get(model, (0, 0))
+    return ((input_tokens or 0) * input_price + (output_tokens or 0) * output_price) / 1_000_000
+
+
+async def _persist_llm_call(doc):
+    try:
+        await db.llm_calls.insert_one(doc)
+    except Exception as e:
+        logger.warning("Could not persist llm call metrics: %s", e)
+
+
+def record_llm_call(task: str, user_id: str = None, *, total_seconds: float, queue_wait_seconds: float, retries: int = 0, hedges: int = 0, failovers: int = 0, upstream_seconds: float = None, response=None, error: Exception = None):
+    """
+    Updates the in-process task metrics and writes the llm_calls row in the
+    background, so the database never sits on the LLM request path.
+    """
+    metrics = _task_metrics.setdefault(task, _new_task_metrics())
+    input_tokens = getattr(response, "input_tokens", None) or 0
+    output_tokens = getattr(response, "output_tokens", None) or 0
+    model = getattr(response, "model", None)
+    cost = estimate_llm_cost(model, input_tokens, output_tokens)
+
+    metrics["calls"] += 1
+    metrics["retries"] += retries
+    metrics["hedges"] += hedges
+    metrics["failovers"] += failovers
+    metrics["latencies"].append(total_seconds)
+    metrics["queue_waits"].append(queue_wait_seconds)
+    if error is not None:
+        metrics["errors"] += 1
+    else:
+        metrics["input_tokens"] += input_tokens
+        metrics["output_tokens"] += output_tokens
+        metrics["cost_usd"] += cost
+        if upstream_seconds is not None:
+            metrics["upstream_latencies"].append(upstream_seconds)
+
+    write = asyncio.create_task(_persist_llm_call({
+        "task": task,
+        "user_id": ObjectId(user_id) if user_id and ObjectId.is_valid(str(user_id)) else None,
+        "provider": getattr(response, "provider", None),
+        "model": model,
+        "status": "failed" if error is not None else "success",
+        "error": str(error)[:500] if error is not None else None,
+        "queue_wait_ms": _ms(queue_wait_seconds),
+        "upstream_ms": _ms(upstream_seconds),
+        "total_ms": _ms(total_seconds),
+        "retries": retries,
+        "hedges": hedges,
+        "failovers": failovers,
+        "input_tokens": input_tokens,
+        "output_tokens": output_tokens,
+        "cost_usd": cost,
+        "created_at": datetime.utcnow()
+    }))
+    _pending_writes.add(write)
+    write.add_done_callback(_pending_writes.discard)
+
+
+def get_llm_task_metrics():
+    result = {}
+    for task, metrics in _task_metrics.items():
+        successes = metrics["calls"] - metrics["errors"]
+        result[task] = {
+            "calls": metrics["calls"],
+            "errors": metrics["errors"],
+            "retries": metrics["retries"],
+            "hedges": metrics["hedges"],
+            "failovers": metrics["failovers"],
+            "input_tokens": metrics["input_tokens"],
+            "output_tokens": metrics["output_tokens"],
+            "avg_output_tokens": round(metrics["output_tokens"] / successes) if successes else 0,
+            "cost_usd": round(metrics["cost_usd"], 4),
+            "latency_p50_ms": _ms(_percentile(metrics["latencies"], 0.5)),
+            "latency_p95_ms": _ms(_percentile(metrics["latencies"], 0.95)),
+            "queue_wait_p50_ms": _ms(_percentile(metrics["queue_waits"], 0.5)),
+            "queue_wait_p95_ms": _ms(_percentile(metrics["queue_waits"], 0.95)),
+            "upstream_p50_ms": _ms(_percentile(metrics["upstream_latencies"], 0.5)),
+            "upstream_p95_ms": _ms(_percentile(metrics["upstream_latencies"], 0.95)),
+        }
+    return result
@@ -0,0 +1,144 @@
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from fpdf import FPDF
+import asyncio
+import multiprocessing
+import os
+import re
+
+PDF_RENDER_WORKERS = int(os.getenv("PDF_RENDER_WORKERS", "2"))
+# Renders allowed to be running or waiting for a worker; further callers wait their turn.
+PDF_RENDER_MAX_PENDING = int(os.getenv("PDF_RENDER_MAX_PENDING", "8"))
+# Part of every stored PDF's key: bump it when the layout changes so old artifacts are not reused.
+TEMPLATE_VERSION = "2"
+
+FONTS_DIR = os.path.join(os.path.dirname(os.path.dirname(__file__)), "deps", "fonts")
+FONT_FAMILY = "NotoSans"
+FONT_FILES = {
+    "": "NotoSans-Regular.ttf",
+    "I": "NotoSans-Italic.ttf",
+    "B": "NotoSans-Bold.ttf",
+}
+
+LEFT_MARGIN = 15
+LIST_INDENT = 8
+
+HEADING_RE = re.compile(r"^(#{1,6})\s+(.*)$")
+LIST_ITEM_RE = re.compile(r"^(?:[-*+]|(\d+)[.)])\s+(.*)$")
+BOLD_RE = re.compile(r"\*\*(.+?)\*\*")
+
+_executor = None
+_pending = None
+
+
+def _load_fonts(pdf):
+    for style, filename in FONT_FILES.items():
+        pdf.add_font(FONT_FAMILY, style, os.path.join(FONTS_DIR, filename))
+
+
+def _write_inline(pdf, text, size):
+    # BOLD_RE.split alternates plain and bold fragments: even indexes are plain text.
+    for i, fragment in enumerate(BOLD_RE.split(text)):
+        if not fragment:
+            continue
+        if i % 2:
+            pdf.set_font(FONT_FAMILY, "B", size)
+            pdf.write(8, fragment)
+            pdf.set_font(FONT_FAMILY, "", size)
+        else:
+            pdf.write(8, fragment)
+
+
+def render_report_pdf(report_text: str, title: str, generated_on: str) -> bytes:
+    """
+    Lays out a markdown report as a PDF. Pure and picklable so it can run in
+    a worker process: no I/O besides reading the bundled fonts.
+    """
+    pdf = FPDF()
+    pdf.set_auto_page_break(auto=True, margin=15)
+    pdf.set_left_margin(LEFT_MARGIN)
+    pdf.set_right_margin(15)
+    pdf.add_page()
+    _load_fonts(pdf)
+
+    # Title
+    pdf.set_font(FONT_FAMILY, "B", 16)
+    pdf.cell(0, 10, title, new_x="LMARGIN", new_y="NEXT", align="C")
+    pdf.ln(10)
+
+    pdf.set_font(FONT_FAMILY, "", 12)
+
+    for line in report_text.split("\n"):
+        line = line.strip()
+
+        if not line:
+            pdf.ln(5)
+            continue
+
+        heading = HEADING_RE.match(line)
+        if heading:
+            level = len(heading.group(1))
+            text = heading.group(2).replace("**", "")
+            if level <= 2:
+                pdf.set_font(FONT_FAMILY, "B", 15)
+                pdf.multi_cell(0, 10, text)
+                pdf.ln(4)
+            else:
+                pdf.set_font(FONT_FAMILY, "B", 13)
+                pdf.multi_cell(0, 8, text)
+                pdf.ln(3)
+            pdf.set_font(FONT_FAMILY, "", 12)
+            continue
+
+        item = LIST_ITEM_RE.match(line)
+        if item:
+            pdf.set_x(LEFT_MARGIN + 2)
+            pdf.write(8, f"{item.group(1)}." if item.group(1) else "\u2022")
+            pdf.set_left_margin(LEFT_MARGIN + LIST_INDENT)
+            pdf.set_x(LEFT_MARGIN + LIST_INDENT)
+            _write_inline(pdf, item.group(2), 12)
+            pdf.set_left_margin(LEFT_MARGIN)
+            pdf.ln(8)
+            continue
+
+        _write_inline(pdf, line, 12)
+        pdf.ln(8)
+
+    pdf.ln(5)
+
+    if pdf.get_y() > 260:
+        pdf.add_page()
+
+    pdf.set_font(FONT_FAMILY, "I", 10)
+    pdf.cell(0, 10, f"Generated on {generated_on}", align="R")
+
+    return bytes(pdf.output())
+
+
+def _get_executor():
+    global _executor
+    if _executor is None:
+        # spawn keeps the workers free of the parent's event loop, sockets and Mongo client.
+        _executor = ProcessPoolExecutor(
+            max_workers=PDF_RENDER_WORKERS,
+            mp_context=multiprocessing.get_context("spawn")
+        )
+    return _executor
+
+
+async def render_pdf(report_text: str, title: str) -> bytes:
+    global _pending
+    if _pending is None:
+        _pending = asyncio.Semaphore(PDF_RENDER_MAX_PENDING)
+
+    generated_on = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+    async with _pending:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(_get_executor(), render_report_pdf, report_text, title, generated_on)
+
+
+def shutdown_pdf_renderer():
+    global _executor
+    if _executor is not None:
+        _executor.shutdown(wait=False, cancel_futures=True)
+        _executor = None
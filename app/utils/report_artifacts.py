@@ -0,0 +1,33 @@
+from app.utils.pdf_renderer import render_pdf, TEMPLATE_VERSION
+from app.utils.storage import get_storage
+import hashlib
+import os
+
+# Lifetime of the download links handed out for stored report PDFs.
+PDF_URL_TTL_SECONDS = int(os.getenv("PDF_URL_TTL_SECONDS", "900"))
+
+
+def report_pdf_key(prefix, report_text, title):
+    digest = hashlib.sha256(
+        "\0".join((TEMPLATE_VERSION, title, report_text)).encode("utf-8")
+    ).hexdigest()
+    return f"{prefix}/{digest}.pdf"
+
+
+async def store_report_pdf(prefix, report_text, title):
+    """
+    Stores the rendered PDF under a key derived from its content, so the
+    same text and template are rendered and uploaded only once.
+    Returns (storage_key, file_url).
+    """
+    storage = get_storage()
+    key = report_pdf_key(prefix, report_text, title)
+    if not await storage.exists(key):
+        pdf_bytes = await render_pdf(report_text, title)
+        await storage.upload_bytes(key, pdf_bytes, "application/pdf")
+    return key, storage.url(key)
+
+
+async def report_pdf_download(storage_key):
+    url = await get_storage().signed_url(storage_key, PDF_URL_TTL_SECONDS)
+    return {"url": url, "expires_in": PDF_URL_TTL_SECONDS}
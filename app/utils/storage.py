@@ -0,0 +1,129 @@
+from app.clients.aws import get_s3_client, S3_BUCKET
+from boto3.s3.transfer import TransferConfig
+from botocore.exceptions import ClientError
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+import asyncio
+import io
+import os
+import tempfile
+
+STORAGE_BACKEND = os.getenv("STORAGE_BACKEND", "s3")
+# Worker threads for blocking storage calls, i.e. how many uploads run at once.
+STORAGE_CONCURRENCY = int(os.getenv("STORAGE_CONCURRENCY", "4"))
+# Files above the threshold are sent as multipart uploads, STORAGE_MULTIPART_CONCURRENCY parts at a time.
+STORAGE_MULTIPART_THRESHOLD_MB = int(os.getenv("STORAGE_MULTIPART_THRESHOLD_MB", "8"))
+STORAGE_MULTIPART_CHUNK_MB = int(os.getenv("STORAGE_MULTIPART_CHUNK_MB", "8"))
+STORAGE_MULTIPART_CONCURRENCY = int(os.getenv("STORAGE_MULTIPART_CONCURRENCY", "4"))
+
+LOCAL_STORAGE_DIR = os.getenv("LOCAL_STORAGE_DIR", "storage")
+LOCAL_STORAGE_URL_PREFIX = os.getenv("LOCAL_STORAGE_URL_PREFIX", "/files")
+
+_executor = ThreadPoolExecutor(max_workers=STORAGE_CONCURRENCY, thread_name_prefix="storage")
+
+
+async def _run_blocking(func, *args, **kwargs):
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_executor, partial(func, *args, **kwargs))
+
+
+class S3Storage:
+    def __init__(self, bucket):
+        self.bucket = bucket
+        self.transfer_config = TransferConfig(
+            multipart_threshold=STORAGE_MULTIPART_THRESHOLD_MB * 1024 * 1024,
+            multipart_chunksize=STORAGE_MULTIPART_CHUNK_MB * 1024 * 1024,
+            max_concurrency=STORAGE_MULTIPART_CONCURRENCY,
+        )
+
+    def url(self, key):
+        return f"https://{self.bucket}.s3.amazonaws.com/{key}"
+
+    async def upload_bytes(self, key, data: bytes, content_type: str):
+        client = get_s3_client()
+        await _run_blocking(
+            client.upload_fileobj,
+            Fileobj=io.BytesIO(data),
+            Bucket=self.bucket,
+            Key=key,
+            ExtraArgs={"ContentType": content_type},
+            Config=self.transfer_config,
+        )
+        return self.url(key)
+
+    async def signed_url(self, key, expires_in):
+        client = get_s3_client()
+        return client.generate_presigned_url(
+            "get_object",
+            Params={"Bucket": self.bucket, "Key": key},
+            ExpiresIn=expires_in,
+        )
+
+    async def exists(self, key):
+        client = get_s3_client()
+        try:
+            await _run_blocking(client.head_object, Bucket=self.bucket, Key=key)
+            return True
+        except ClientError as e:
+            if e.response.get("Error", {}).get("Code") in ("404", "NoSuchKey", "NotFound"):
+                return False
+            raise
+
+
+class LocalStorage:
+    """
+    Development backend: files are served by the StaticFiles mount in
+    app.main, so every URL is public and never expires. Use S3 in production.
+    """
+
+    def __init__(self, root, url_prefix):
+        self.root = os.path.abspath(root)
+        self.url_prefix = url_prefix.rstrip("/")
+
+    def url(self, key):
+        return f"{self.url_prefix}/{key}"
+
+    def _path(self, key):
+        path = os.path.abspath(os.path.join(self.root, key))
+        if not path.startswith(self.root + os.sep):
+            raise ValueError(f"Invalid storage key: {key}")
+        return path
+
+    def _write(self, path, data):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # A temp file per write, so concurrent uploads of one key never share it.
+        with tempfile.NamedTemporaryFile(dir=os.path.dirname(path), suffix=".tmp", delete=False) as f:
+            tmp_path = f.name
+            f.write(data)
+        try:
+            os.chmod(tmp_path, 0o644)
+            os.replace(tmp_path, path)
+        except Exception:
+            os.unlink(tmp_path)
+            raise
+
+    async def upload_bytes(self, key, data: bytes, content_type: str):
+        await _run_blocking(self._write, self._path(key), data)
+        return self.url(key)
+
+    async def signed_url(self, key, expires_in):
+        # No signing here: expires_in is ignored and the plain public URL is returned.
+        return self.url(key)
+
+    async def exists(self, key):
+        return await _run_blocking(os.path.exists, self._path(key))
+
+
+_storage = None
+
+
+def get_storage():
+    global _storage
+    if _storage is None:
+        if STORAGE_BACKEND == "local":
+            _storage = LocalStorage(LOCAL_STORAGE_DIR, LOCAL_STORAGE_URL_PREFIX)
+        elif STORAGE_BACKEND == "s3":
+            _storage = S3Storage(S3_BUCKET)
+        else:
+            raise ValueError(f"Unknown STORAGE_BACKEND: {STORAGE_BACKEND}")
+    return _storage
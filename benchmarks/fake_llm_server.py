@@ -0,0 +1,276 @@
+"""
+Local stand-in for the Gemini generate-content API (and the OpenAI chat
+completions fallback) so chat, reports and dashboards can be load-tested
+without spending quota.
+
+Run it and point the app at it:
+
+    python benchmarks/fake_llm_server.py --port 8090
+    GEMINI_BASE_URL=http://localhost:8090 OPENAI_BASE_URL=http://localhost:8090/v1 uvicorn app.main:app
+
+Behaviour is controlled with FAKE_LLM_* env vars and can be changed while
+running through GET/PATCH /_fake/config:
+
+    FAKE_LLM_LATENCY        fixed:<s> | uniform:<lo>,<hi> | normal:<mean>,<sd> | lognormal:<median>,<sigma>
+    FAKE_LLM_STREAM_DELAY   seconds between streamed chunks
+    FAKE_LLM_ERROR_RATE     probability (0-1) of answering with FAKE_LLM_ERROR_STATUS
+    FAKE_LLM_ERROR_STATUS   429 by default, 503 to simulate outages
+    FAKE_LLM_MAX_CONCURRENCY  requests above this many in flight get a 429 (0 = unlimited)
+    FAKE_LLM_RESPONSE_WORDS   length of free-text answers
+    FAKE_LLM_TEMPLATES      JSON file of [{"match": <regex>, "response": <text>}]; the response
+                            is formatted with {model}, {prompt} and {prompt_words}
+"""
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+import argparse
+import asyncio
+import json
+import math
+import os
+import random
+import re
+import time
+
+app = FastAPI(title="Fake LLM")
+
+config = {
+    "latency": os.getenv("FAKE_LLM_LATENCY", "lognormal:1.5,0.4"),
+    "stream_delay": float(os.getenv("FAKE_LLM_STREAM_DELAY", "0.05")),
+    "error_rate": float(os.getenv("FAKE_LLM_ERROR_RATE", "0")),
+    "error_status": int(os.getenv("FAKE_LLM_ERROR_STATUS", "429")),
+    "max_concurrency": int(os.getenv("FAKE_LLM_MAX_CONCURRENCY", "0")),
+    "response_words": int(os.getenv("FAKE_LLM_RESPONSE_WORDS", "250")),
+}
+
+stats = {"requests": 0, "errors": 0, "in_flight": 0, "max_in_flight": 0}
+
+_templates = []
+if os.getenv("FAKE_LLM_TEMPLATES"):
+    with open(os.getenv("FAKE_LLM_TEMPLATES")) as f:
+        _templates = [(re.compile(t["match"], re.IGNORECASE | re.DOTALL), t["response"]) for t in json.load(f)]
+
+WORDS = (
+    "the moon in your chart favours patience while saturn asks for discipline and steady effort "
+    "venus brings warmth to relationships and jupiter opens doors in career and learning this period "
+    "rewards careful planning honest conversations and trust in your own timing"
+).split()
+
+COLORS = [("Green", "#008000"), ("Royal Blue", "#4169E1"), ("Maroon", "#800000"), ("Gold", "#FFD700")]
+SIGNS = ["Aries", "Taurus", "Gemini", "Cancer", "Leo", "Virgo", "Libra", "Scorpio", "Sagittarius", "Capricorn", "Aquarius", "Pisces"]
+
+
+def sample_latency(settings=None):
+    settings = settings or config
+    kind, _, params = settings["latency"].partition(":")
+    values = [float(v) for v in params.split(",") if v]
+    if kind == "fixed":
+        return values[0]
+    if kind == "uniform":
+        return random.uniform(values[0], values[1])
+    if kind == "normal":
+        return max(0.0, random.gauss(values[0], values[1]))
+    if kind == "lognormal":
+        return random.lognormvariate(math.log(values[0]), values[1])
+    raise ValueError(f"Unknown latency distribution: {settings['latency']}")
+
+
+def count_tokens(text):
+    return max(1, len(text) // 4)
+
+
+def free_text(words):
+    return " ".join(random.choice(WORDS) for _ in range(words)).capitalize() + "."
+
+
+def canned_response(prompt, system_instruction, max_tokens):
+    full = f"{system_instruction}\n{prompt}"
+
+    for pattern, response in _templates:
+        if pattern.search(full):
+            return response.format(model="fake", prompt=prompt, prompt_words=len(prompt.split()))
+
+    if "prediction_dict" in full:
+        color, color_hex = random.choice(COLORS)
+        return json.dumps({
+            "text": free_text(120),
+            "prediction_dict": {
+                "lucky_number": random.randint(1, 9),
+                "lucky_color": color,
+                "lucky_color_hex": color_hex,
+                "lucky_time": f"{random.randint(1, 12):02d}:00 {random.choice(['AM', 'PM'])}",
+                "name": "Seeker",
+                "element": random.choice(["Fire", "Earth", "Air", "Water"]),
+                "moon_sign": random.choice(SIGNS),
+                "polarity": random.choice(["Positive", "Negative"]),
+                "modality": random.choice(["Cardinal", "Fixed", "Mutable"]),
+            }
+        })
+
+    categories = re.findall(r"'([^']+)'", full.split("ONLY allowed categories:")[-1].split("\n\n")[0]) or ["career"]
+    if '"answers"' in full:
+        questions = [line for line in prompt.splitlines() if line.strip()]
+        return "```json\n" + json.dumps({"answers": [random.choice(categories) for _ in questions]}) + "\n```"
+    if "strict classifier" in full:
+        return random.choice(categories)
+
+    if '"questions"' in full:
+        return json.dumps({"questions": [
+            "Will my career see a positive shift in the coming months?",
+            "What does my chart say about love this year?",
+            "Is this a good time for me to start something new?",
+        ]})
+
+    words = config["response_words"]
+    if max_tokens:
+        words = min(words, int(max_tokens * 0.75))
+    return free_text(max(words, 1))
+
+
+def gemini_prompt(body):
+    def texts(content):
+        return [part.get("text", "") for part in (content or {}).get("parts", [])]
+
+    prompt = "\n".join(t for c in body.get("contents", []) for t in texts(c))
+    system = "\n".join(texts(body.get("systemInstruction") or body.get("system_instruction")))
+    generation_config = body.get("generationConfig") or body.get("generation_config") or {}
+    return prompt, system, generation_config.get("maxOutputTokens") or generation_config.get("max_output_tokens")
+
+
+def gemini_payload(model, text, prompt_tokens, finished=True):
+    payload = {
+        "candidates": [{"content": {"role": "model", "parts": [{"text": text}]}, "index": 0}],
+        "modelVersion": model,
+    }
+    if finished:
+        output_tokens = count_tokens(text)
+        payload["candidates"][0]["finishReason"] = "STOP"
+        payload["usageMetadata"] = {
+            "promptTokenCount": prompt_tokens,
+            "candidatesTokenCount": output_tokens,
+            "totalTokenCount": prompt_tokens + output_tokens,
+        }
+    return payload
+
+
+def error_response(status_code):
+    stats["errors"] += 1
+    status_names = {429: "RESOURCE_EXHAUSTED", 500: "INTERNAL", 503: "UNAVAILABLE"}
+    return JSONResponse(
+        status_code=status_code,
+        content={"error": {
+            "code": status_code,
+            "message": "Resource has been exhausted (e.g. check quota)." if status_code == 429 else "The service is currently unavailable.",
+            "status": status_names.get(status_code, "UNKNOWN"),
+        }}
+    )
+
+
+def admit():
+    stats["requests"] += 1
+    if config["max_concurrency"] and stats["in_flight"] >= config["max_concurrency"]:
+        return error_response(429)
+    if random.random() < config["error_rate"]:
+        return error_response(config["error_status"])
+    return None
+
+
+class _InFlight:
+    def __enter__(self):
+        stats["in_flight"] += 1
+        stats["max_in_flight"] = max(stats["max_in_flight"], stats["in_flight"])
+
+    def __exit__(self, *exc):
+        stats["in_flight"] -= 1
+
+
+@app.post("/{api_version}/models/{model_action}")
+async def gemini_generate(api_version: str, model_action: str, request: Request):
+    model, _, action = model_action.partition(":")
+    rejected = admit()
+    if rejected:
+        return rejected
+
+    body = await request.json()
+    prompt, system, max_tokens = gemini_prompt(body)
+    prompt_tokens = count_tokens(prompt + system)
+    text = canned_response(prompt, system, max_tokens)
+
+    if action == "streamGenerateContent":
+        async def events():
+            with _InFlight():
+                await asyncio.sleep(sample_latency() / 3)
+                words = text.split(" ")
+                for i in range(0, len(words), 8):
+                    last = i + 8 >= len(words)
+                    chunk = " ".join(words[i:i + 8]) + ("" if last else " ")
+                    yield f"data: {json.dumps(gemini_payload(model, chunk, prompt_tokens, finished=last))}\r\n\r\n"
+                    await asyncio.sleep(config["stream_delay"])
+        return StreamingResponse(events(), media_type="text/event-stream")
+
+    with _InFlight():
+        await asyncio.sleep(sample_latency())
+    return gemini_payload(model, text, prompt_tokens)
+
+
+@app.post("/v1/chat/completions")
+async def openai_chat_completions(request: Request):
+    rejected = admit()
+    if rejected:
+        return rejected
+
+    body = await request.json()
+    messages = body.get("messages", [])
+    system = "\n".join(m["content"] for m in messages if m.get("role") == "system")
+    prompt = "\n".join(m["content"] for m in messages if m.get("role") != "system")
+    text = canned_response(prompt, system, body.get("max_tokens"))
+
+    with _InFlight():
+        await asyncio.sleep(sample_latency())
+
+    prompt_tokens = count_tokens(prompt + system)
+    output_tokens = count_tokens(text)
+    return {
+        "id": f"chatcmpl-fake-{stats['requests']}",
+        "object": "chat.completion",
+        "created": int(time.time()),
+        "model": body.get("model"),
+        "choices": [{"index": 0, "message": {"role": "assistant", "content": text}, "finish_reason": "stop"}],
+        "usage": {"prompt_tokens": prompt_tokens, "completion_tokens": output_tokens, "total_tokens": prompt_tokens + output_tokens},
+    }
+
+
+@app.get("/_fake/config")
+async def get_config():
+    return {"config": config, "stats": stats}
+
+
+@app.patch("/_fake/config")
+async def update_config(request: Request):
+    updates = await request.json()
+    # Validated on a copy so a bad value leaves the running config untouched.
+    candidate = dict(config)
+    try:
+        for key, value in updates.items():
+            if key in candidate:
+                candidate[key] = type(candidate[key])(value)
+        sample_latency(candidate)
+        if not 0 <= candidate["error_rate"] <= 1:
+            raise ValueError("error_rate must be between 0 and 1")
+        if min(candidate["stream_delay"], candidate["max_concurrency"], candidate["response_words"]) < 0:
+            raise ValueError("stream_delay, max_concurrency and response_words cannot be negative")
+    except (TypeError, ValueError, IndexError) as e:
+        return JSONResponse(status_code=400, content={"error": str(e), "config": config})
+    config.update(candidate)
+    if updates.get("reset_stats"):
+        stats.update({"requests": 0, "errors": 0, "max_in_flight": stats["in_flight"]})
+    return {"config": config, "stats": stats}
+
+
+if __name__ == "__main__":
+    import uvicorn
+
+    parser = argparse.ArgumentParser(description="Fake Gemini/OpenAI server for offline load tests")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8090)
+    args = parser.parse_args()
+    uvicorn.run(app, host=args.host, port=args.port, log_level="warning")
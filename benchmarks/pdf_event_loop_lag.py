@@ -0,0 +1,93 @@
+"""
+Event-loop lag while rendering report PDFs, inline (the old behaviour)
+versus through the process-pool renderer.
+
+    python benchmarks/pdf_event_loop_lag.py --reports 8 --sections 12
+
+A ticker coroutine asks to wake up every --tick-ms; how late it wakes up
+is the time every other request on the same worker would have waited.
+"""
+import argparse
+import asyncio
+import os
+import random
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.utils.pdf_renderer import render_pdf, render_report_pdf, shutdown_pdf_renderer
+
+WORDS = (
+    "the moon in your chart favours patience while saturn asks for discipline and steady effort "
+    "venus brings warmth to relationships and **jupiter opens doors** in career and learning"
+).split()
+
+
+def sample_report(sections):
+    parts = []
+    for i in range(sections):
+        parts.append(f"## Section {i + 1}")
+        for _ in range(4):
+            parts.append(" ".join(random.choice(WORDS) for _ in range(80)))
+            parts.append("")
+        parts.append(f"### Key dates {i + 1}")
+        parts.append(" ".join(random.choice(WORDS) for _ in range(40)))
+    return "\n".join(parts)
+
+
+async def measure(render, reports, tick_ms):
+    lags = []
+    stop = asyncio.Event()
+
+    async def ticker():
+        interval = tick_ms / 1000
+        while not stop.is_set():
+            started = time.perf_counter()
+            await asyncio.sleep(interval)
+            lags.append((time.perf_counter() - started - interval) * 1000)
+
+    tick_task = asyncio.create_task(ticker())
+    await asyncio.sleep(0.1)
+    started = time.perf_counter()
+    await asyncio.gather(*(render(text) for text in reports))
+    elapsed = time.perf_counter() - started
+    stop.set()
+    await tick_task
+
+    lags.sort()
+    return {
+        "wall_s": round(elapsed, 2),
+        "lag_p50_ms": round(statistics.median(lags), 1),
+        "lag_p99_ms": round(lags[min(len(lags) - 1, int(len(lags) * 0.99))], 1),
+        "lag_max_ms": round(lags[-1], 1),
+    }
+
+
+async def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--reports", type=int, default=8)
+    parser.add_argument("--sections", type=int, default=12)
+    parser.add_argument("--tick-ms", type=float, default=10)
+    args = parser.parse_args()
+
+    reports = [sample_report(args.sections) for _ in range(args.reports)]
+
+    async def inline(text):
+        return render_report_pdf(text, "Benchmark Report", "now")
+
+    async def pooled(text):
+        return await render_pdf(text, "Benchmark Report")
+
+    # Warm the pool so worker start-up is not counted against it.
+    await pooled(reports[0])
+
+    print(f"{args.reports} reports x {args.sections} sections")
+    print("inline :", await measure(inline, reports, args.tick_ms))
+    print("pool   :", await measure(pooled, reports, args.tick_ms))
+    shutdown_pdf_renderer()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
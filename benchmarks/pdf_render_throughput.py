@@ -0,0 +1,117 @@
+"""
+Pages per second and peak memory of the report PDF renderer, compared with
+the previous per-render implementation (fonts re-registered on every
+document, regex split per line).
+
+    python benchmarks/pdf_render_throughput.py --reports 20 --sections 12
+"""
+import argparse
+import os
+import random
+import re
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fpdf import FPDF
+from app.utils.pdf_renderer import FONTS_DIR, render_report_pdf
+
+WORDS = (
+    "the moon in your chart favours patience while saturn asks for discipline and steady effort "
+    "venus brings warmth to relationships and **jupiter opens doors** in career and learning"
+).split()
+
+PAGE_RE = re.compile(rb"/Type /Page\b(?!s)")
+
+
+def sample_report(sections):
+    parts = []
+    for i in range(sections):
+        parts.append(f"## Section {i + 1}")
+        for _ in range(3):
+            parts.append(" ".join(random.choice(WORDS) for _ in range(80)))
+            parts.append("")
+        parts.extend(f"- **Point {j}:** " + " ".join(random.choice(WORDS) for _ in range(20)) for j in range(4))
+        parts.append(f"### Key dates {i + 1}")
+        parts.append(" ".join(random.choice(WORDS) for _ in range(40)))
+    return "\n".join(parts)
+
+
+def legacy_render(report_text, title, generated_on):
+    pdf = FPDF()
+    pdf.set_auto_page_break(auto=True, margin=15)
+    pdf.set_left_margin(15)
+    pdf.set_right_margin(15)
+    pdf.add_page()
+    pdf.add_font("NotoSans", "", os.path.join(FONTS_DIR, "NotoSans-Regular.ttf"))
+    pdf.add_font("NotoSans", "I", os.path.join(FONTS_DIR, "NotoSans-Italic.ttf"))
+    pdf.add_font("NotoSans", "B", os.path.join(FONTS_DIR, "NotoSans-Bold.ttf"))
+    pdf.set_font("NotoSans", "B", 16)
+    pdf.cell(0, 10, title, new_x="LMARGIN", new_y="NEXT", align="C")
+    pdf.ln(10)
+    pdf.set_font("NotoSans", "", 12)
+    for line in report_text.split("\n"):
+        line = line.strip()
+        if not line:
+            pdf.ln(5)
+            continue
+        if line.startswith("## "):
+            pdf.set_font("NotoSans", "B", 15)
+            pdf.multi_cell(0, 10, line.replace("## ", ""))
+            pdf.ln(4)
+            pdf.set_font("NotoSans", "", 12)
+            continue
+        if line.startswith("### "):
+            pdf.set_font("NotoSans", "B", 13)
+            pdf.multi_cell(0, 8, line.replace("### ", ""))
+            pdf.ln(3)
+            pdf.set_font("NotoSans", "", 12)
+            continue
+        for part in re.split(r'(\*\*.*?\*\*)', line):
+            if part.startswith("**") and part.endswith("**"):
+                pdf.set_font("NotoSans", "B", 12)
+                pdf.write(8, part.replace("**", ""))
+                pdf.set_font("NotoSans", "", 12)
+            else:
+                pdf.write(8, part)
+        pdf.ln(8)
+    pdf.ln(5)
+    pdf.set_font("NotoSans", "I", 10)
+    pdf.cell(0, 10, f"Generated on {generated_on}", align="R")
+    return bytes(pdf.output())
+
+
+def run(name, render, reports):
+    render(reports[0], "Benchmark Report", "now")
+
+    pages = 0
+    started = time.perf_counter()
+    for text in reports:
+        pages += len(PAGE_RE.findall(render(text, "Benchmark Report", "now")))
+    elapsed = time.perf_counter() - started
+
+    # Measured separately: tracemalloc slows allocation-heavy code down a lot.
+    tracemalloc.start()
+    render(reports[0], "Benchmark Report", "now")
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    print(f"{name:8} {len(reports) / elapsed:6.2f} reports/s  {pages / elapsed:7.1f} pages/s  peak {peak / 1024 / 1024:6.1f} MiB per render")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--reports", type=int, default=20)
+    parser.add_argument("--sections", type=int, default=12)
+    args = parser.parse_args()
+
+    random.seed(7)
+    reports = [sample_report(args.sections) for _ in range(args.reports)]
+    run("legacy", legacy_render, reports)
+    run("current", render_report_pdf, reports)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,111 @@
+"""
+End-to-end throughput of the local-hour notification pipeline: the create
+cycle inserting notifications, then claimed batches delivered through the
+fake push transport until nothing is pending.
+
+Needs a throwaway MongoDB (the database given by --db is dropped):
+
+    MONGO_URI=mongodb://localhost:27017 python benchmarks/push_throughput.py --users 10000,100000,1000000
+
+FAKE_PUSH_LATENCY_MS, FAKE_PUSH_UNREGISTERED_RATE, PUSH_CONCURRENCY and
+PUSH_BATCH_NOTIFICATIONS are read as usual, so their effect can be compared.
+"""
+import argparse
+import asyncio
+import os
+import sys
+import time
+from datetime import datetime, timedelta, timezone
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+parser = argparse.ArgumentParser()
+parser.add_argument("--users", default="10000,100000,1000000", help="comma separated user counts")
+parser.add_argument("--db", default="astroguru_push_bench")
+parser.add_argument("--devices-per-user", type=int, default=1)
+parser.add_argument("--seed-batch", type=int, default=10000)
+args = parser.parse_args()
+
+os.environ["MONGO_DB"] = args.db
+os.environ["PUSH_TRANSPORT"] = "fake"
+for name in ("MONGO_USERNAME", "MONGO_PASSWORD", "MONGO_HOST"):
+    os.environ.setdefault(name, "bench")
+
+from app.db.mongo import db
+from app.db.indexes import ensure_indexes
+from app.clients.firebase import fake_transport
+from app.services.notification_service import create_notification_for_users_at_local_hour, push_pending_notifications, zones_at_local_hour
+
+TARGET_HOUR = 8
+
+
+def bench_time():
+    # Two minutes past the hour in India: a moment where TARGET_HOUR zones exist, kept in the past so send_at is due.
+    now = datetime.now(timezone.utc).replace(hour=2, minute=32, second=0, microsecond=0)
+    return now if now < datetime.now(timezone.utc) else now - timedelta(days=1)
+
+
+async def seed(users, zones):
+    await db.client.drop_database(args.db)
+    await ensure_indexes()
+    started = time.perf_counter()
+    for offset in range(0, users, args.seed_batch):
+        count = min(args.seed_batch, users - offset)
+        batch = [
+            {
+                "role": "user",
+                "is_enabled": True,
+                "is_onboarded": True,
+                "is_push_notifications_enabled": True,
+                "timezone": zones[(offset + i) % len(zones)]
+            }
+            for i in range(count)
+        ]
+        result = await db.users.insert_many(batch, ordered=False)
+        await db.user_devices.insert_many([
+            {
+                "user_id": user_id,
+                "device_token": f"token-{user_id}-{d}",
+                "platform": "android",
+                "is_active": True,
+                "created_at": datetime.utcnow(),
+                "updated_at": datetime.utcnow()
+            }
+            for user_id in result.inserted_ids
+            for d in range(args.devices_per_user)
+        ], ordered=False)
+    return time.perf_counter() - started
+
+
+async def run(users):
+    now_utc = bench_time()
+    zones = sorted(zones_at_local_hour(now_utc, TARGET_HOUR))
+    seed_s = await seed(users, zones)
+    fake_transport.reset()
+
+    started = time.perf_counter()
+    await create_notification_for_users_at_local_hour("Good morning", "Benchmark", TARGET_HOUR, "morning", now_utc=now_utc)
+    created_s = time.perf_counter() - started
+    created = await db.notifications.count_documents({})
+
+    started = time.perf_counter()
+    while await db.notifications.count_documents({"status": {"$in": ["pending", "sending"]}}):
+        await push_pending_notifications()
+    deliver_s = time.perf_counter() - started
+
+    total_s = created_s + deliver_s
+    print(
+        f"{users:>9} users  seed {seed_s:7.1f}s  create {created_s:7.2f}s  deliver {deliver_s:7.2f}s  "
+        f"created {created}  pushed {fake_transport.delivered}  fcm calls {fake_transport.calls}  "
+        f"{fake_transport.delivered / total_s:9.0f} pushes/s end to end"
+    )
+
+
+async def main():
+    for users in (int(u) for u in args.users.split(",")):
+        await run(users)
+    await db.client.drop_database(args.db)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -1,12 +1,15 @@
 import asyncio
 import logging
-from app.services.notification_service import start_scheduler
+from app.services.notification_service import start_scheduler, run_push_dispatcher
+from app.services.campaign_service import start_campaign_scheduler
 
 logging.basicConfig(level=logging.INFO)
 
 async def main():
     logging.info("Starting scheduler process...")
+    start_campaign_scheduler()
     start_scheduler()  
+    await run_push_dispatcher()
     while True:
         await asyncio.sleep(60)
 